@@ -20,6 +20,7 @@ import moment from "moment";
 
 interface Meal {
   _id?: string;
+  id?: string;
   name: string;
   time: string;
   calories: number;
@@ -108,6 +109,7 @@ const History = () => {
           setMealsID(data.meals[0]._id);
           const processedMeals = data.meals[0].mealsList.map((meal: Meal) => ({
             _id: meal._id,
+            id: meal.id,
             name: meal.name,
             time: formatTimeFromDate(meal.time),
             calories: meal.calories,
@@ -149,6 +151,7 @@ const History = () => {
         if (data.meals.length > 0 && data.meals[0].mealsList) {
           const processedMeals = data.meals[0].mealsList.map((meal: Meal) => ({
             _id: meal._id,
+            id: meal.id,
             name: meal.name,
             time: formatTimeFromDate(meal.time),
             calories: meal.calories,
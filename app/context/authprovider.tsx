@@ -49,6 +49,7 @@ interface Meal {
 }
 
 interface MealItem {
+  id?: string;
   name: string;
   time: string;
   calories: number;
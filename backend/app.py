@@ -1,11 +1,14 @@
 import os
+import threading
+import time
 import certifi
-from flask import Flask
+from flask import Flask, request
 from dotenv import load_dotenv
 from extensions import mongo, bcrypt, jwt
+from indexes import ensure_indexes
 from routes.register import register_bp
 from routes.login import login_bp
-from routes.detect import detect_bp
+from routes.detect import detect_bp, warm_up
 from routes.update_user import update_user_bp
 from routes.update_password import update_password_bp
 from routes.delete_user import delete_user_bp
@@ -19,6 +22,8 @@ from routes.update_meal import update_meal_bp
 from routes.support_message import support_message_bp
 from routes.statistics import statistics_bp
 from routes.ai_nutrition_advisor import ai_nutrition_advisor_bp
+from routes.health import health_bp
+from services import readiness
 
 load_dotenv()
 app = Flask(__name__)
@@ -46,6 +51,61 @@ app.register_blueprint(update_meal_bp)
 app.register_blueprint(support_message_bp)
 app.register_blueprint(statistics_bp)
 app.register_blueprint(ai_nutrition_advisor_bp)
+app.register_blueprint(health_bp)
+
+# The unique foods/meals indexes back the cross-process upsert guarantees, so every
+# startup path must build them: /ready reports "indexes" until they exist, and
+# /ready or the first write request builds them if warmup hasn't (flask run,
+# gunicorn app:app, WARMUP=0).
+readiness.register("indexes")
+INDEX_RETRY_SECONDS = 30
+_indexes_lock = threading.Lock()
+_indexes_ready = False
+_indexes_next_try = 0.0
+
+def create_indexes():
+    """Ensure the MongoDB indexes once per process; returns whether they exist.
+
+    After a failure, calls within INDEX_RETRY_SECONDS return False at once.
+    """
+    # Runs off the import path: reaching MongoDB can block for the full server selection timeout.
+    global _indexes_ready, _indexes_next_try
+    with _indexes_lock:
+        if _indexes_ready:
+            return True
+        # Checked under the lock so requests queued behind a failing attempt don't each retry it.
+        if time.monotonic() < _indexes_next_try:
+            return False
+        try:
+            with app.app_context():
+                ensure_indexes(mongo.db)
+            _indexes_ready = True
+            readiness.mark_ready("indexes")
+        except Exception as e:
+            print(f"Could not ensure MongoDB indexes: {e}")
+            _indexes_next_try = time.monotonic() + INDEX_RETRY_SECONDS
+            readiness.mark_failed("indexes", e)
+        return _indexes_ready
+
+@app.before_request
+def _ensure_indexes_before_request():
+    if _indexes_ready:
+        return
+    if request.method not in ("GET", "HEAD", "OPTIONS") or request.endpoint == "health_bp.ready":
+        create_indexes()
+
+def start_warmup():
+    """Create indexes, load the detection model and lookup tables in the background; /ready reports progress."""
+    readiness.register("indexes", "model", "class_nutrition")
+
+    def run():
+        create_indexes()
+        warm_up()
+
+    threading.Thread(target=run, name="warmup", daemon=True).start()
 
 if __name__ == '__main__':
+    # With the debug reloader only the child process (WERKZEUG_RUN_MAIN) serves requests.
+    if os.getenv("WARMUP", "1") == "1" and os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warmup()
     app.run(debug=True, host='0.0.0.0', port=5002)
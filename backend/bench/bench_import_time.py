@@ -0,0 +1,77 @@
+"""Measure how long importing the Flask app takes in a fresh interpreter.
+
+Each run spawns ``python -X importtime -c "import app"`` from the backend
+directory, reports the wall time across runs and lists the modules ``app``
+imports directly in the last run, slowest cumulative first. Use it to check
+that heavy dependencies (ultralytics, torch, openai, boto3) stay off the
+import path.
+
+    python bench/bench_import_time.py --runs 5 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def import_once(env):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise SystemExit(f"import app failed:\n{proc.stderr[-2000:]}")
+    return elapsed, proc.stderr
+
+
+def slowest(importtime_log, top):
+    """Modules imported directly by ``app``, slowest cumulative first.
+
+    Lines look like "import time:   self [us] | cumulative | imported package";
+    nesting is shown by two spaces of indentation per level in the last column.
+    """
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        if depth == 1:
+            rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app import time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "bench")
+    env.setdefault("MONGO_URI", "mongodb://localhost:27017/foodsmart")
+    env.setdefault("JWT_SECRET_KEY", "bench")
+
+    timings = []
+    log = ""
+    for _ in range(args.runs):
+        elapsed, log = import_once(env)
+        timings.append(elapsed)
+
+    print(f"import app: median {statistics.median(timings) * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms over {args.runs} runs")
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for cumulative, self_us, name in slowest(log, args.top):
+        print(f"{cumulative / 1000:>14.1f}{self_us / 1000:>10.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""Offline benchmark for the /detect and /food pipelines.
+
+Runs the real Flask routes in-process against a corpus of synthetic (and
+optionally sample) food images, an in-memory Mongo stand-in (mongomock) and a
+deterministic OpenAI stub that injects latency instead of calling the API.
+Reports throughput, p50/p95/p99 latency and the peak RSS sampled while each
+scenario ran.
+
+Run from the backend directory:
+
+    python bench/bench_pipelines.py                      # real best.pt
+    python bench/bench_pipelines.py --stub-model         # pipeline overhead only
+    python bench/bench_pipelines.py --images ~/plates --concurrency 8 --json out.json
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+FOOD_NAMES = [
+    "Egg", "Rice", "Banana", "Apple", "Chicken Breast", "Salmon", "Broccoli", "Bread",
+    "Pasta", "Avocado", "Tomato", "Cheese", "Yogurt", "Oats", "Potato", "Carrot",
+]
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+
+
+class _Completion:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+
+
+class StubCompletions:
+    """Stands in for ``client.chat.completions`` with seeded latency and fixed answers."""
+
+    def __init__(self, latency_ms, jitter_ms, seed):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def create(self, model, messages, timeout=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_ms + self._rng.uniform(0, self.jitter_ms)
+        # Honour the per-call timeout llm.chat() passes, like the real client does.
+        if timeout is not None and delay / 1000.0 > timeout:
+            time.sleep(timeout)
+            import openai
+            try:
+                from httpx2 import Request
+            except ImportError:
+                from httpx import Request
+            raise openai.APITimeoutError(request=Request("POST", "https://api.openai.com/v1/chat/completions"))
+        time.sleep(delay / 1000.0)
+        content = messages[-1]["content"]
+        if isinstance(content, list):
+            return _Completion(json.dumps([
+                {"label": "Rice", "confidence": 0.82},
+                {"label": "Chicken Breast", "confidence": 0.74},
+            ]))
+        name = content.split('food name "', 1)[-1].split('"', 1)[0]
+        seed = sum(map(ord, name))
+        return _Completion(json.dumps({
+            "name": name,
+            "unit": "gram",
+            "piece_avg_weight": None,
+            "avg_gram": 100 + seed % 150,
+            "cal": 50 + seed % 300,
+            "protein": seed % 25,
+            "fat": seed % 15,
+            "carbohydrates": seed % 60,
+        }))
+
+
+class StubOpenAI:
+    def __init__(self, latency_ms=400.0, jitter_ms=100.0, seed=0):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = StubCompletions(latency_ms, jitter_ms, seed)
+
+
+class StubModel:
+    """YOLO stand-in: brighter images "contain" food, darker ones fall back to Vision."""
+
+    names = {i: n for i, n in enumerate(FOOD_NAMES)}
+    overrides = {"imgsz": 640}
+    backend_name = "stub"
+
+    def __call__(self, images, **kwargs):
+        from types import SimpleNamespace
+
+        images = images if isinstance(images, list) else [images]
+        results = []
+        for img in images:
+            small = cv2.resize(img, (64, 64))
+            mean = float(small.mean())
+            conf = min(0.99, mean / 200.0)
+            box = SimpleNamespace(cls=[int(mean) % len(self.names)], conf=[conf], xyxy=[[0, 0, 10, 10]])
+            results.append(SimpleNamespace(boxes=[box]))
+        return results
+
+
+def synthetic_images(count, seed):
+    """JPEG bytes of plate-like scenes at typical phone resolutions."""
+    rng = np.random.default_rng(seed)
+    sizes = [(4032, 3024), (3024, 4032), (1920, 1080), (1280, 960), (640, 480)]
+    out = []
+    for i in range(count):
+        w, h = sizes[i % len(sizes)]
+        img = np.full((h, w, 3), rng.integers(40, 230), np.uint8)
+        cv2.circle(img, (w // 2, h // 2), min(w, h) // 3, (235, 235, 235), -1)
+        for _ in range(6):
+            center = (int(rng.integers(w // 4, 3 * w // 4)), int(rng.integers(h // 4, 3 * h // 4)))
+            color = tuple(int(c) for c in rng.integers(0, 255, 3))
+            cv2.circle(img, center, int(min(w, h) // rng.integers(10, 20)), color, -1)
+        noise = rng.integers(0, 12, (h, w, 3), dtype=np.uint8)
+        img = cv2.add(img, noise)
+        ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        out.append((f"synthetic-{i}-{w}x{h}.jpg", buf.tobytes()))
+    return out
+
+
+def sample_images(directory):
+    paths = sorted(p for p in Path(directory).expanduser().iterdir()
+                   if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    return [(p.name, p.read_bytes()) for p in paths]
+
+
+def process_peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def current_rss_mb():
+    """Resident set size right now (Linux); falls back to the process-wide peak elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return process_peak_rss_mb()
+
+
+class RSSSampler:
+    """Peak of current RSS sampled every ``interval`` seconds while the block runs.
+
+    ru_maxrss only ever grows, so it can't tell one scenario's peak from an
+    earlier scenario's.
+    """
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+
+def run_scenario(name, make_request, jobs, concurrency):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(job):
+        nonlocal errors
+        start = time.perf_counter()
+        status = make_request(job)
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+            if status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    with RSSSampler() as rss, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, jobs))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "p50_ms": round(pct(0.50), 2),
+        "p95_ms": round(pct(0.95), 2),
+        "p99_ms": round(pct(0.99), 2),
+        "peak_rss_mb": round(rss.peak, 1),
+        "process_peak_rss_mb": round(process_peak_rss_mb(), 1),
+    }
+
+
+def build_app(args):
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    if not args.cache:
+        os.environ["DETECT_CACHE_SIZE"] = "0"
+    os.chdir(BACKEND_DIR)
+
+    import mongomock
+    from flask import Flask
+    from extensions import mongo
+
+    mongo.cx = mongomock.MongoClient()
+    mongo.db = mongo.cx["foodsmart_bench"]
+
+    if args.stub_model:
+        import services.inference
+        services.inference.load_model = lambda *a, **k: StubModel()
+
+    from routes import detect, food
+    from services import llm
+
+    stub = StubOpenAI(args.llm_latency_ms, args.llm_jitter_ms, args.seed)
+    llm._client = stub
+
+    app = Flask("bench")
+    app.register_blueprint(detect.detect_bp)
+    app.register_blueprint(food.food_bp)
+    return app, stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", help="directory of sample food photos to add to the corpus")
+    parser.add_argument("--synthetic", type=int, default=10, help="number of synthetic images")
+    parser.add_argument("--iterations", type=int, default=3, help="passes over the image corpus")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--food-requests", type=int, default=200)
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--stub-model", action="store_true", help="replace YOLO with a constant-time stub")
+    parser.add_argument("--cache", action="store_true", help="keep the detection result cache enabled")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    app, stub = build_app(args)
+    client_local = threading.local()
+
+    def http():
+        if not hasattr(client_local, "client"):
+            client_local.client = app.test_client()
+        return client_local.client
+
+    corpus = synthetic_images(args.synthetic, args.seed)
+    if args.images:
+        corpus += sample_images(args.images)
+
+    def post_image(path):
+        def request(job):
+            filename, data = job
+            resp = http().post(path, data={"image": (io.BytesIO(data), filename)})
+            resp.get_data()
+            return resp.status_code
+        return request
+
+    def post_food(job):
+        return http().post("/food", json={"name": job}).status_code
+
+    rng = random.Random(args.seed)
+    food_jobs = [rng.choice(FOOD_NAMES) for _ in range(args.food_requests)]
+
+    results = [
+        run_scenario("detect", post_image("/detect"), corpus * args.iterations, args.concurrency),
+        run_scenario("detect+nutrition", post_image("/detect/nutrition"), corpus, args.concurrency),
+        run_scenario("food", post_food, food_jobs, args.concurrency),
+    ]
+
+    header = f"{'scenario':<18}{'reqs':>6}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'peak MB':>9}"
+    print(header)
+    for r in results:
+        print(f"{r['scenario']:<18}{r['requests']:>6}{r['errors']:>5}{r['throughput_rps']:>9.2f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['peak_rss_mb']:>9.1f}")
+    print(f"stubbed LLM calls: {stub.chat.completions.calls}")
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
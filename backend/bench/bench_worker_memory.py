@@ -0,0 +1,73 @@
+"""Report per-process memory of a running gunicorn master and its workers.
+
+Reads /proc/<pid>/smaps_rollup (Linux 4.14+), so it has to run on the host
+serving the app:
+
+    python bench/bench_worker_memory.py --pidfile /tmp/foodsmart-gunicorn.pid
+    python bench/bench_worker_memory.py --pid 12345 --json
+
+RSS counts pages shared with the master in every worker. PSS splits shared
+pages between the processes mapping them, so the PSS column sums to the real
+footprint; Private is what each worker added on its own.
+"""
+import argparse
+import json
+from pathlib import Path
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def rollup(pid):
+    """smaps_rollup fields in kB for one process."""
+    values = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+        key, _, rest = line.partition(":")
+        if key in FIELDS:
+            values[key] = int(rest.split()[0])
+    return values
+
+
+def children(pid):
+    kids = []
+    for task in Path(f"/proc/{pid}/task").iterdir():
+        kids += [int(c) for c in (task / "children").read_text().split()]
+    return kids
+
+
+def report(master):
+    rows = []
+    for role, pid in [("master", master)] + [("worker", c) for c in children(master)]:
+        m = rollup(pid)
+        rows.append({
+            "role": role,
+            "pid": pid,
+            "rss_mb": m["Rss"] / 1024,
+            "pss_mb": m["Pss"] / 1024,
+            "shared_mb": (m["Shared_Clean"] + m["Shared_Dirty"]) / 1024,
+            "private_mb": (m["Private_Clean"] + m["Private_Dirty"]) / 1024,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker memory of a gunicorn deployment")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--pid", type=int, help="gunicorn master pid")
+    group.add_argument("--pidfile", help="gunicorn pidfile (see gunicorn.conf.py)")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    master = args.pid or int(Path(args.pidfile).read_text().strip())
+    rows = report(master)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{'role':<8}{'pid':>8}{'rss MB':>10}{'pss MB':>10}{'shared MB':>11}{'private MB':>12}")
+    for r in rows:
+        print(f"{r['role']:<8}{r['pid']:>8}{r['rss_mb']:>10.1f}{r['pss_mb']:>10.1f}"
+              f"{r['shared_mb']:>11.1f}{r['private_mb']:>12.1f}")
+    print(f"total PSS {sum(r['pss_mb'] for r in rows):.1f} MB across {len(rows)} processes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Gunicorn settings for the production entry point (see wsgi.py).
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every value can be overridden from the environment.
+"""
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5002")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Threads let one worker overlap Mongo/OpenAI waits and feed the batch scheduler
+# (services/batching.py) with concurrent uploads.
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# Import wsgi.py (model, warmup, tables) in the master so workers share it copy-on-write.
+preload_app = os.getenv("PRELOAD", "1") == "1"
+# Vision fallbacks and food generation call OpenAI; leave room for a slow response.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+# Recycling workers would re-fork from the master, which still holds the shared
+# model, so it is cheap; off by default.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+pidfile = os.getenv("GUNICORN_PIDFILE", "/tmp/foodsmart-gunicorn.pid")
+accesslog = "-"
+
+
+def post_worker_init(worker):
+    import wsgi
+
+    # Split the CPUs between workers instead of every worker spawning cpu_count threads.
+    per_worker = max(1, (os.cpu_count() or 1) // worker.cfg.workers)
+    wsgi.worker_init(int(os.getenv("YOLO_THREADS", per_worker)))
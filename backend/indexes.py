@@ -0,0 +1,20 @@
+from pymongo import ASCENDING
+
+
+def ensure_indexes(db):
+    """Create the indexes the routes rely on; safe to call on every start."""
+    # Unique so concurrent generations across worker processes upsert one record.
+    db.foods.create_index(
+        [("key", ASCENDING)],
+        name="foods_key",
+        unique=True,
+        partialFilterExpression={"key": {"$type": "string"}},
+    )
+    db.foods.create_index([("aliases", ASCENDING)], name="foods_aliases")
+    # One document per user and day; POST /meals upserts against it. Existing
+    # duplicate days must be merged first: scripts/merge_meal_days.py.
+    db.meals.create_index(
+        [("userId", ASCENDING), ("date", ASCENDING)],
+        name="meals_user_date",
+        unique=True,
+    )
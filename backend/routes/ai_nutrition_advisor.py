@@ -2,17 +2,17 @@ from flask import Blueprint, request, jsonify
 from extensions import mongo
 from bson import ObjectId
 import datetime
-import openai
 import os
 from dotenv import load_dotenv
 import json
 import random
 import requests
+from services import llm
+from services.meal_store import with_display_names
 
 load_dotenv()
 
 ai_nutrition_advisor_bp = Blueprint('ai_nutrition_advisor', __name__)
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
 user_recent_advice = {}
 
@@ -53,7 +53,7 @@ def get_user_nutrition_data(user_id, date_str):
             total_carbs += meal.get('totalCarbo', 0)
             total_fats += meal.get('totalFat', 0)
             
-            for meal_item in meal.get('mealsList', []):
+            for meal_item in with_display_names(meal.get('mealsList', [])):
                 meal_details.append({
                     'name': meal_item.get('name', ''),
                     'time': meal_item.get('time', ''),
@@ -356,10 +356,7 @@ def generate_ai_advice(user_data, user_id):
         else:  
             prompt = generate_tips_prompt(user_data)
         
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        response = client.chat.completions.create(
+        response = llm.chat(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a professional nutritionist providing personalized advice. Always respond in valid JSON format. Be creative and avoid repetitive suggestions."},
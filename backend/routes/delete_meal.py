@@ -1,16 +1,20 @@
 from flask import Blueprint, request, jsonify
 from extensions import mongo
 from bson import ObjectId
+from services.meal_store import apply_to_entry, delete_entry_pipeline, entry_ref, miss_reason, with_display_names
 
 delete_meal_bp = Blueprint('delete_meal', __name__, url_prefix='/api/user')
 
 @delete_meal_bp.route('/<user_id>/delete_meal', methods=['DELETE'])
 def delete_user_meal(user_id):
     meal_id = request.json.get('mealId')
+    entry_id = request.json.get('entryId')
     meal_name = request.json.get('mealName')
     
-    if not meal_id or not meal_name:
-        return jsonify({'message': 'Missing required fields: mealId and mealName'}), 400
+    # Entries are addressed by entryId; "Meal N" names from older clients still work.
+    ref = entry_ref(entry_id, meal_name)
+    if not meal_id or not ref:
+        return jsonify({'message': 'Missing required fields: mealId and entryId or mealName'}), 400
     
     try:
         uid = ObjectId(user_id)
@@ -18,45 +22,21 @@ def delete_user_meal(user_id):
     except Exception:
         return jsonify({'message': 'Invalid ID format.'}), 400
     
-    meal_doc = mongo.db.meals.find_one({'_id': mid, 'userId': uid})
-    
-    if not meal_doc:
-        return jsonify({'message': 'Meal not found or not authorized'}), 404
-    
-    if 'mealsList' not in meal_doc:
-        return jsonify({'message': 'mealsList not found in this meal document'}), 400
+    # One atomic server-side update: drop the entry and recompute totals. Nothing is
+    # renumbered; the remaining entries' display names follow from their positions.
+    meal_doc = apply_to_entry(mongo.db.meals, mid, uid, ref, delete_entry_pipeline(ref))
 
-    updated_meals_list = [meal for meal in meal_doc['mealsList'] if meal.get('name') != meal_name]
-    
-    if len(updated_meals_list) == len(meal_doc['mealsList']):
+    if not meal_doc:
+        missing = miss_reason(mongo.db.meals, mid, uid)
+        if missing == 'day':
+            return jsonify({'message': 'Meal not found or not authorized'}), 404
+        if missing == 'mealsList':
+            return jsonify({'message': 'mealsList not found in this meal document'}), 400
+        if 'id' in ref:
+            return jsonify({'message': f'Meal entry "{entry_id}" not found in mealsList'}), 404
         return jsonify({'message': f'Meal with name "{meal_name}" not found in mealsList'}), 404
-    
-    for i, meal in enumerate(updated_meals_list):
-        meal['name'] = f"Meal {i + 1}"
-    
-    update_result = mongo.db.meals.update_one(
-        {'_id': mid},
-        {'$set': {'mealsList': updated_meals_list}}
-    )
-    
-    if update_result.modified_count == 0:
-        return jsonify({'message': 'Failed to update meal document'}), 500
-    
-    total_calories = round(sum(meal.get('calories', 0) for meal in updated_meals_list), 1)
-    total_fat = round(sum(meal.get('fat', 0) for meal in updated_meals_list), 1)
-    total_protein = round(sum(meal.get('protein', 0) for meal in updated_meals_list), 1)
-    total_carbo = round(sum(meal.get('carbo', 0) for meal in updated_meals_list), 1)
-    
-    mongo.db.meals.update_one(
-        {'_id': mid},
-        {'$set': {
-            'totalCalories': total_calories,
-            'totalFat': total_fat,
-            'totalProtein': total_protein,
-            'totalCarbo': total_carbo
-        }}
-    )
+
     return jsonify({
-        'message': 'Meal deleted and meal names updated successfully',
-        'updatedMealsList': updated_meals_list
-    }), 200 
\ No newline at end of file
+        'message': 'Meal deleted successfully',
+        'updatedMealsList': with_display_names(meal_doc['mealsList'])
+    }), 200 
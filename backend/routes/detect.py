@@ -1,76 +1,474 @@
-from flask import Blueprint, request, jsonify
-from ultralytics import YOLO
-import cv2, numpy as np, os, base64, json, re
+from flask import Blueprint, request, jsonify, g, Response, stream_with_context
+import numpy as np, os, base64, json, re, threading, time
+from collections import Counter
 from dotenv import load_dotenv
-from openai import OpenAI, OpenAIError
+from services.batching import scheduler_from_env
+from services.detection_cache import cache_from_env, image_digest, perceptual_hash
+from services.preprocess import decode_for_model, encode_for_vision
+from services.inference import load_model, model_input_size
+from services.worker_pool import pool_from_env
+from services.metrics import StageMetrics, server_timing_header
+from services.circuit import CircuitBreaker
+from routes.food import resolve_foods, find_foods
+from services.food_names import normalize_food_name
+from services import llm, readiness
 
 load_dotenv()
-API_KEY = os.getenv("OPENAI_API_KEY")
-if not API_KEY:
-    raise RuntimeError("Please set OPENAI_API_KEY in your .env file")
-client = OpenAI(api_key=API_KEY)
 detect_bp = Blueprint('detect_bp', __name__)
-model = YOLO("best.pt")
 YOLO_CONF_THRESHOLD = 0.6 
+# Per-stage latency histograms and counters, served under "metrics" in GET /detect/stats.
+# DETECT_SERVER_TIMING=1 also reports each request's stage timings in a Server-Timing
+# response header.
+detect_metrics = StageMetrics()
+SERVER_TIMING = os.getenv("DETECT_SERVER_TIMING", "0") == "1"
+# DETECT_WORKERS > 0 runs YOLO in separate processes (services/worker_pool.py);
+# otherwise the model lives in this process. Either way nothing is loaded at import:
+# warm_up() does it in the background at startup, or the first request does.
+detect_pool = pool_from_env()
+# YOLO_BACKEND selects PyTorch, ONNX Runtime or OpenVINO; see services/inference.py.
+model = None
+model_lock = threading.Lock()
+# Concurrent uploads share one batched forward pass instead of contending for the model.
+# Tune with DETECT_MAX_BATCH / DETECT_MAX_WAIT_MS; DETECT_MAX_BATCH=1 disables batching.
+# One scheduler per input size, since a batch must share imgsz.
+batchers = {}
+batchers_lock = threading.Lock()
+inference_lock = threading.Lock()
+
+# Cascade mode: a cheap low-resolution pass first, escalating to the full-resolution
+# pass when it has no confident detection or some candidates fall in
+# [DETECT_CASCADE_MARGIN, YOLO_CONF_THRESHOLD).
+CASCADE = os.getenv("DETECT_CASCADE", "0") == "1"
+CASCADE_LOW_IMGSZ = int(os.getenv("DETECT_CASCADE_LOW_IMGSZ", "320"))
+CASCADE_MARGIN = float(os.getenv("DETECT_CASCADE_MARGIN", "0.3"))
+tier_hits = Counter()
+# Class id -> nutrition for every YOLO label, read from foods once, so YOLO hits are
+# turned into nutrition without a database or network lookup. Seed missing records
+# with scripts/seed_yolo_foods.py.
+class_nutrition = None
+class_ids = {}
+class_nutrition_lock = threading.Lock()
+
+def get_model():
+    global model
+    if model is None:
+        with model_lock:
+            if model is None:
+                model = load_model()
+    return model
+
+def model_imgsz():
+    if detect_pool is not None:
+        detect_pool.start()
+        return detect_pool.imgsz
+    return model_input_size(get_model())
+
+def model_names():
+    if detect_pool is not None:
+        detect_pool.start()
+        return detect_pool.names
+    return get_model().names
+
+def warm_up(runs=1):
+    """Load the model (or start the worker pool), run dummy inferences and load class nutrition.
+
+    Meant for a background thread at startup or for wsgi.py before forking;
+    progress is reported by /ready.
+    """
+    if warm_up_model(runs):
+        warm_up_tables()
+
+def warm_up_model(runs=1):
+    """Run ``runs`` dummy inferences at every input size requests will use.
+
+    The first call at a given size pays for graph/kernel initialization, so
+    doing it here keeps that cost off the first real request.
+    """
+    try:
+        sizes = [model_imgsz()]
+        if CASCADE and CASCADE_LOW_IMGSZ not in sizes:
+            sizes.append(CASCADE_LOW_IMGSZ)
+        for imgsz in sizes:
+            blank = np.zeros((imgsz, imgsz, 3), np.uint8)
+            for _ in range(runs):
+                if detect_pool is not None:
+                    detect_pool.submit(blank, imgsz=imgsz)
+                else:
+                    with inference_lock:
+                        get_model()(blank, imgsz=imgsz, verbose=False)
+        readiness.mark_ready("model")
+        return True
+    except Exception as e:
+        print(f"Model warmup failed: {e}")
+        readiness.mark_failed("model", e)
+        return False
+
+def warm_up_tables():
+    try:
+        with class_nutrition_lock:
+            load_class_nutrition()
+        readiness.mark_ready("class_nutrition")
+    except Exception as e:
+        print(f"Class nutrition warmup failed: {e}")
+        readiness.mark_failed("class_nutrition", e)
+
+def load_class_nutrition(generate=False):
+    """(Re)build class_nutrition from the foods collection.
+
+    With ``generate=True`` missing records are created through the LLM first.
+    Returns the labels that still have no nutrition record.
+    """
+    global class_nutrition, class_ids
+    names = dict(model_names())
+    labels = list(names.values())
+    if generate:
+        foods, _, _ = resolve_foods(labels)
+    else:
+        found = find_foods(labels)
+        foods = {n: found[normalize_food_name(n)] for n in labels if normalize_food_name(n) in found}
+    class_ids = {label: cid for cid, label in names.items()}
+    class_nutrition = {cid: foods[label] for cid, label in names.items() if label in foods}
+    return [label for label in labels if label not in foods]
+
+def nutrition_for_label(label):
+    """Nutrition for a YOLO class label from the in-memory table, or None."""
+    if class_nutrition is None:
+        with class_nutrition_lock:
+            if class_nutrition is None:
+                load_class_nutrition()
+    return class_nutrition.get(class_ids.get(label))
+
+def remember_class_nutrition(foods):
+    """Add freshly resolved YOLO labels to the in-memory table."""
+    for label, food in foods.items():
+        if label in class_ids:
+            class_nutrition[class_ids[label]] = food
+
+def _batcher(imgsz):
+    with batchers_lock:
+        if imgsz not in batchers:
+            m = get_model()
+
+            def infer(images):
+                # Each size has its own batcher thread but they share one model, and
+                # Ultralytics sets predictor args (imgsz included) outside its own
+                # lock, so only one batch may run at a time.
+                with inference_lock:
+                    return m(images, imgsz=imgsz, verbose=False)
+
+            batchers[imgsz] = scheduler_from_env(infer)
+        return batchers[imgsz]
+
+def run_yolo(img, imgsz=None):
+    """All YOLO detections for a decoded image as [{"label", "confidence"}], unfiltered."""
+    imgsz = imgsz or model_imgsz()
+    with detect_metrics.time("yolo"):
+        if detect_pool is not None:
+            return detect_pool.submit(img, imgsz=imgsz, timeout=detect_pool.task_timeout)
+        res = _batcher(imgsz).submit(img)
+    with detect_metrics.time("postprocess"):
+        return [
+            {"label": model_names()[int(box.cls[0])], "confidence": float(box.conf[0])}
+            for box in getattr(res, "boxes", [])
+        ]
+
+def detect_confident(img):
+    """Return (detections above YOLO_CONF_THRESHOLD, tier that produced them, all candidates)."""
+    if CASCADE:
+        detections = run_yolo(img, CASCADE_LOW_IMGSZ)
+        confident = [d for d in detections if d["confidence"] >= YOLO_CONF_THRESHOLD]
+        marginal = [d for d in detections if CASCADE_MARGIN <= d["confidence"] < YOLO_CONF_THRESHOLD]
+        # Only a confident, unambiguous low-res answer is final. An empty one may just
+        # mean the items are too small to see at CASCADE_LOW_IMGSZ.
+        if confident and not marginal:
+            return confident, "low", detections
+    detections = run_yolo(img)
+    return [d for d in detections if d["confidence"] >= YOLO_CONF_THRESHOLD], "full", detections
+
+# Re-uploads of the same photo skip decode, YOLO and Vision entirely.
+detection_cache = cache_from_env()
+
+# Each detection gets DETECT_BUDGET_MS end to end. If Vision can't answer inside it,
+# or the breaker has opened after sustained Vision failures/slowness, the best
+# sub-threshold YOLO candidates are returned instead, marked low_confidence.
+DETECT_BUDGET_MS = int(os.getenv("DETECT_BUDGET_MS", "8000"))
+DEGRADED_MAX_ITEMS = int(os.getenv("DETECT_DEGRADED_MAX_ITEMS", "5"))
+# Below this much remaining budget Vision isn't attempted at all.
+VISION_MIN_BUDGET_MS = int(os.getenv("VISION_MIN_BUDGET_MS", "500"))
+vision_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("VISION_BREAKER_FAILURES", "5")),
+    cooldown=float(os.getenv("VISION_BREAKER_COOLDOWN", "30")),
+    slow_after=int(os.getenv("VISION_SLOW_MS", "5000")) / 1000,
+)
+
+def degraded_candidates(candidates):
+    """Best sub-threshold YOLO candidates, one per label, marked low_confidence."""
+    best = {}
+    for c in candidates:
+        if c["label"] not in best or c["confidence"] > best[c["label"]]["confidence"]:
+            best[c["label"]] = c
+    ranked = sorted(best.values(), key=lambda c: c["confidence"], reverse=True)
+    return [dict(c, low_confidence=True) for c in ranked[:DEGRADED_MAX_ITEMS]]
+
+@detect_bp.after_request
+def _report_preprocess(response):
+    stats = g.pop("preprocess_stats", None)
+    if stats:
+        response.headers["X-Detect-Preprocess"] = json.dumps(stats, separators=(",", ":"))
+    timings = g.pop("stage_timings", None)
+    if SERVER_TIMING and timings:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    degraded = g.pop("detect_degraded", None)
+    if degraded:
+        response.headers["X-Detect-Degraded"] = degraded
+    return response
+
+@detect_bp.route('/detect/stats', methods=['GET'])
+def detect_stats():
+    resolved = sum(tier_hits.values())
+    return jsonify({
+        "cascade": CASCADE,
+        "tiers": {
+            tier: {"hits": tier_hits[tier], "hit_rate": (tier_hits[tier] / resolved) if resolved else 0.0}
+            for tier in ("low", "full", "vision")
+        },
+        "cache": detection_cache.stats(),
+        "batching": {size: b.stats() for size, b in batchers.items()},
+        "pool": detect_pool.stats() if detect_pool is not None else None,
+        "llm": llm.stats(),
+        "vision_breaker": vision_breaker.stats(),
+        "metrics": detect_metrics.snapshot(),
+    }), 200
+
+def iter_detection(data, deadline=None):
+    """Run the detection pipeline on uploaded image bytes, yielding each stage as it finishes.
+
+    Yields ``(stage, payload, status, final)`` tuples where stage is "yolo",
+    "vision", "degraded" or "error" and payload is the list of {"label",
+    "confidence"} objects (an error dict for "error"). The "yolo" payload also
+    carries sub-threshold candidates, marked ``provisional``, when a Vision stage
+    follows. "degraded" replaces "vision" when Vision times out against
+    ``deadline`` (default: DETECT_BUDGET_MS from now) or its breaker is open.
+    Other OpenAI errors propagate to the caller.
+    """
+    deadline = deadline if deadline is not None else llm.deadline_in(DETECT_BUDGET_MS / 1000)
+    digest = image_digest(data)
+    # YOLO entries are (confident detections, all candidates): a re-upload whose
+    # first attempt fell through to Vision can still degrade to the candidates.
+    cached_yolo = detection_cache.get("yolo", digest)
+    if cached_yolo is not None and cached_yolo[0]:
+        detect_metrics.incr("cache_hits")
+        yield "yolo", cached_yolo[0], 200, True
+        return
+    cached_vision = detection_cache.get("vision", digest)
+    if cached_vision is not None:
+        detect_metrics.incr("cache_hits")
+        yield "vision", cached_vision, 200, True
+        return
+
+    imgsz = model_imgsz()
+    with detect_metrics.time("decode"):
+        img, g.preprocess_stats = decode_for_model(data, imgsz)
+    if img is None:
+        yield "error", {"error": "Failed to decode image"}, 400, True
+        return
+
+    phash = None
+    if cached_yolo is None and detection_cache.use_phash:
+        phash = perceptual_hash(img)
+        cached_yolo = detection_cache.get_near("yolo", phash)
+
+    if cached_yolo is not None:
+        yolo_objects, candidates = cached_yolo
+    else:
+        yolo_objects, tier, candidates = detect_confident(img)
+        if yolo_objects:
+            tier_hits[tier] += 1
+            detect_metrics.incr("yolo_hits")
+        detection_cache.set("yolo", digest, (yolo_objects, candidates), phash)
+
+    if yolo_objects:
+        yield "yolo", yolo_objects, 200, True
+        return
+    detect_metrics.incr("vision_fallbacks")
+    yield "yolo", [dict(c, provisional=True) for c in candidates], 200, False
+
+    if phash is not None:
+        cached_vision = detection_cache.get_near("vision", phash)
+        if cached_vision is not None:
+            yield "vision", cached_vision, 200, True
+            return
+
+    # Running out of budget locally (slow decode/YOLO) says nothing about Vision's
+    # health, so it degrades without touching the breaker.
+    if deadline - time.monotonic() < VISION_MIN_BUDGET_MS / 1000:
+        yield from _degrade(candidates, "timeout")
+        return
+    if not vision_breaker.allow():
+        yield from _degrade(candidates, "circuit_open")
+        return
+
+    print("No YOLO hits, falling back to OpenAI Vision…")
+    try:
+        with detect_metrics.time("base64"):
+            b64_image = base64.b64encode(encode_for_vision(img, g.preprocess_stats, original=data)).decode('utf-8')
+    except BaseException:
+        # Nothing reached OpenAI; don't leave a half-open trial stuck in flight.
+        vision_breaker.release()
+        raise
+    vision_prompt = [
+        {
+            "type": "text",
+            "text": (
+                "Identify each individual food item in this image and return a pure JSON array of objects, "
+                "each with keys 'label' (string) and 'confidence' (number 0–1). "
+                "No markdown, no code fences, no extra text. Example: [{\"label\":\"Chicken\",\"confidence\":0.9}, ...]"
+            )
+        },
+        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64_image}"}}
+    ]
+    started = time.monotonic()
+    try:
+        with detect_metrics.time("vision"):
+            response = llm.chat(
+                deadline=deadline,
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": vision_prompt}],
+                temperature=0,
+                max_tokens=200,
+            )
+    except llm.LLMUnavailable as e:
+        # Only calls that reached OpenAI say anything about its health; a full
+        # semaphore or an already spent deadline is local.
+        if e.attempts:
+            vision_breaker.record(False)
+        else:
+            vision_breaker.release()
+        yield from _degrade(candidates, "timeout")
+        return
+    except llm.APITimeoutError:
+        vision_breaker.record(False)
+        yield from _degrade(candidates, "timeout")
+        return
+    except Exception as e:
+        # A rejected request (400, 401, ...) is our fault, not a sign OpenAI is down.
+        if llm.is_upstream_failure(e):
+            vision_breaker.record(False)
+        else:
+            vision_breaker.release()
+        raise
+    vision_breaker.record(True, time.monotonic() - started)
+
+    content = response.choices[0].message.content.strip()
+    content = re.sub(r"^```(?:json)?\n?", "", content)
+    content = re.sub(r"\n?```$", "", content)
+
+    try:
+        vision_objects = json.loads(content)
+    except Exception as e:
+        yield "error", {"error": "Vision parse failed", "details": str(e)}, 500, True
+        return
+
+    detection_cache.set("vision", digest, vision_objects, phash)
+    tier_hits["vision"] += 1
+    yield "vision", vision_objects, 200, True
+
+def _degrade(candidates, reason):
+    detect_metrics.incr("vision_degraded")
+    g.detect_degraded = reason
+    yield "degraded", degraded_candidates(candidates), 200, True
+
+def run_detection(data):
+    """Detect food items in uploaded image bytes and return the final ``(payload, status)``."""
+    for stage, payload, status, final in iter_detection(data):
+        if final:
+            return payload, status
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @detect_bp.route('/detect', methods=['POST'])
 def detect():
     try:
-
         if 'image' not in request.files:
             return jsonify({"error": "No image provided"}), 400
-        data = request.files['image'].read()
-        npimg = np.frombuffer(data, np.uint8)
-        img = cv2.imdecode(npimg, cv2.IMREAD_COLOR)
-        if img is None:
-            return jsonify({"error": "Failed to decode image"}), 400
-
-        results = model(img)
-        yolo_objects = []
-        for res in results:
-            for box in getattr(res, "boxes", []):
-                conf = float(box.conf[0])
-                label = model.names[int(box.cls[0])]
-                if conf < YOLO_CONF_THRESHOLD:
-                    continue
-                yolo_objects.append({"label": label, "confidence": conf})
+        with detect_metrics.time("upload_read"):
+            data = request.files['image'].read()
+        payload, status = run_detection(data)
+        return jsonify(payload), status
 
-        if yolo_objects:
-            return jsonify(yolo_objects)
-
-        print("No YOLO hits, falling back to OpenAI Vision…")
-        b64_image = base64.b64encode(data).decode('utf-8')
-        vision_prompt = [
-            {
-                "type": "text",
-                "text": (
-                    "Identify each individual food item in this image and return a pure JSON array of objects, "
-                    "each with keys 'label' (string) and 'confidence' (number 0–1). "
-                    "No markdown, no code fences, no extra text. Example: [{\"label\":\"Chicken\",\"confidence\":0.9}, ...]"
-                )
-            },
-            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64_image}"}}
-        ]
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": vision_prompt}],
-            temperature=0,
-            max_tokens=200,
-        )
+    except llm.LLMUnavailable as e:
+        return jsonify({"error": "OpenAI unavailable", "details": str(e)}), 503
+    except llm.OpenAIError as e:
+        return jsonify({"error": "OpenAI API error", "details": str(e)}), 500
+    except Exception as e:
+        return jsonify({"error": "Internal server error"}), 500
 
-        content = response.choices[0].message.content.strip()
-        content = re.sub(r"^```(?:json)?\n?", "", content)
-        content = re.sub(r"\n?```$", "", content)
+@detect_bp.route('/detect/stream', methods=['POST'])
+def detect_stream():
+    """Server-Sent Events variant of /detect.
 
+    Emits a "yolo" event as soon as the model has run; when nothing clears the
+    threshold it holds provisional low-confidence candidates and a "vision"
+    event with the refined result follows on the same connection, or a
+    "degraded" event when Vision misses the latency budget.
+    """
+    if 'image' not in request.files:
+        return jsonify({"error": "No image provided"}), 400
+    with detect_metrics.time("upload_read"):
+        data = request.files['image'].read()
+
+    def events():
         try:
-            vision_objects = json.loads(content)
-        except Exception as e:
-            return jsonify({"error": "Vision parse failed", "details": str(e)}), 500
+            for stage, payload, status, final in iter_detection(data):
+                if stage == "error":
+                    yield _sse("error", dict(payload, status=status))
+                else:
+                    yield _sse(stage, {"items": payload, "final": final})
+        except llm.LLMUnavailable as e:
+            yield _sse("error", {"error": "OpenAI unavailable", "details": str(e), "status": 503})
+        except llm.OpenAIError as e:
+            yield _sse("error", {"error": "OpenAI API error", "details": str(e), "status": 500})
+        except Exception:
+            yield _sse("error", {"error": "Internal server error", "status": 500})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@detect_bp.route('/detect/nutrition', methods=['POST'])
+def detect_with_nutrition():
+    """Detect items and attach per-100 g nutrition for each label in one round trip."""
+    try:
+        if 'image' not in request.files:
+            return jsonify({"error": "No image provided"}), 400
+        with detect_metrics.time("upload_read"):
+            data = request.files['image'].read()
+        payload, status = run_detection(data)
+        if status != 200:
+            return jsonify(payload), status
 
-        return jsonify(vision_objects), 200
+        detected = [obj for obj in payload if isinstance(obj, dict)]
+        known = {obj.get("label"): nutrition_for_label(obj.get("label")) for obj in detected}
+        foods, errors, _ = resolve_foods([label for label, food in known.items() if food is None])
+        remember_class_nutrition(foods)
+        foods.update({label: food for label, food in known.items() if food is not None})
+        items = []
+        for obj in detected:
+            label = obj.get("label")
+            item = {"label": label, "confidence": obj.get("confidence"), "nutrition": foods.get(label)}
+            if obj.get("low_confidence"):
+                item["low_confidence"] = True
+            if label in errors:
+                item["error"] = errors[label]
+            items.append(item)
+        return jsonify({"items": items}), 200
 
-    except OpenAIError as e:
+    except llm.LLMUnavailable as e:
+        return jsonify({"error": "OpenAI unavailable", "details": str(e)}), 503
+    except llm.OpenAIError as e:
         return jsonify({"error": "OpenAI API error", "details": str(e)}), 500
     except Exception as e:
         return jsonify({"error": "Internal server error"}), 500
-
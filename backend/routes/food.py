@@ -1,35 +1,50 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, request, jsonify
-from openai import OpenAI              
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from extensions import mongo
 from dotenv import load_dotenv
+from services.cache import LRUTTLCache
+from services.food_names import normalize_food_name, display_name
+from services.singleflight import SingleFlight
+from services import llm
 
 load_dotenv()
 
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
+if not os.getenv("OPENAI_API_KEY"):
     print("Warning: OPENAI_API_KEY not found in environment variables.")
     print("You need to create a .env file in the backend directory with your OpenAI API key:")
     print("OPENAI_API_KEY=your_api_key_here")
-    api_key = input("Enter your OpenAI API key to continue: ")
-
-client = OpenAI(api_key=api_key)
 
 food_bp = Blueprint("food_bp", __name__, url_prefix="/food")
 
-@food_bp.route("", methods=["POST"])
-def get_or_create_food():
-    data = request.get_json()
-    name = data.get("name")
-    if not name:
-        return jsonify({"error": "Missing 'name' parameter"}), 400
+# Lookups go through normalize_food_name(), so "Banana", "bananas" and "banana "
+# resolve to the record stored under key "banana" (or listing it in "aliases").
+# Cache entries are keyed the same way.
+# Common foods are answered from memory instead of a Mongo round trip. Entries are
+# filled on read and on insert; failed generations are remembered briefly so a
+# name the LLM can't handle doesn't trigger a new call on every request.
+food_cache = LRUTTLCache(
+    maxsize=int(os.getenv("FOOD_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("FOOD_CACHE_TTL", "3600")),
+)
+FOOD_FAILURE_TTL = float(os.getenv("FOOD_CACHE_FAILURE_TTL", "30"))
+FOOD_BATCH_MAX = int(os.getenv("FOOD_BATCH_MAX", "100"))
+FOOD_BATCH_CONCURRENCY = int(os.getenv("FOOD_BATCH_CONCURRENCY", "8"))
 
-    existing = mongo.db.foods.find_one({"name": name})
-    if existing:
-        existing.pop("_id", None)
-        return jsonify(existing), 200
+# Concurrent misses for the same key wait on one in-flight LLM generation.
+food_flight = SingleFlight()
 
+class FoodLookupFailure:
+    """Cached marker for a name whose nutrition could not be generated."""
+
+    def __init__(self, message):
+        self.message = message
+
+def generate_nutrition(name):
+    """Ask the LLM for per-100 g nutrition of ``name``; raises on API or parse errors."""
     prompt = f"""
     You are a registered nutritionist. Given the food name "{name}", provide its nutritional values **normalized to 100 g** (ignore other serving sizes; scaling is done in the frontend).  
     
@@ -57,18 +72,203 @@ def get_or_create_food():
     "carbohydrates": <number: g carbs per 100 g>
     }}
     """
+    chat_resp = llm.chat(
+        model="gpt-4.1-mini",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0,
+        max_tokens=300
+    )
+    content = chat_resp.choices[0].message.content.strip()
+    nutrition = json.loads(content)
+    nutrition["name"] = display_name(name)
+    return nutrition
+
+def public_food(doc):
+    """A foods document without its storage-only fields."""
+    return {k: v for k, v in doc.items() if k not in ("_id", "key", "aliases")}
+
+def food_keys(doc):
+    """Every normalized key a stored foods document answers to."""
+    return {doc.get("key") or normalize_food_name(doc.get("name", "")), *doc.get("aliases", [])}
+
+def find_foods(names):
+    """Canonical records for ``names`` in one query, as {key: public document}.
+
+    Documents written before keys existed are still matched by exact name.
+    """
+    keys = list({normalize_food_name(n) for n in names})
+    found = {}
+    cursor = mongo.db.foods.find({"$or": [
+        {"key": {"$in": keys}},
+        {"aliases": {"$in": keys}},
+        {"name": {"$in": list(names)}},
+    ]})
+    for doc in cursor:
+        for key in food_keys(doc) & set(keys):
+            found.setdefault(key, public_food(doc))
+    return found
+
+def store_foods(generated):
+    """Upsert generated nutrition, {key: document}, in one bulk write.
+
+    Relies on the unique index on ``key``: when another process stored the
+    same food first, its record wins and is returned instead of ours.
+    Returns {key: public document as stored}.
+    """
+    keys = list(generated)
+    ops = [
+        UpdateOne({"key": key}, {"$setOnInsert": dict(generated[key], key=key, aliases=[])}, upsert=True)
+        for key in keys
+    ]
     try:
-        chat_resp = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-            max_tokens=300
-        )
-        content = chat_resp.choices[0].message.content.strip()
-        nutrition = json.loads(content)
+        upserted = mongo.db.foods.bulk_write(ops, ordered=False).upserted_ids
+    except BulkWriteError as e:
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+        upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+
+    stored = {key: generated[key] for i, key in enumerate(keys) if i in upserted}
+    existing = [key for key in keys if key not in stored]
+    if existing:
+        for doc in mongo.db.foods.find({"key": {"$in": existing}}):
+            stored[doc["key"]] = public_food(doc)
+    return stored
+
+def resolve_foods(names, max_workers=FOOD_BATCH_CONCURRENCY):
+    """Resolve many food names with one ``$in`` query, generating misses concurrently.
+
+    Returns ``(foods, errors, created)``: name -> nutrition document, name ->
+    error message for names that could not be generated, and the set of names
+    whose record was generated by this call. Spelling variants of one food
+    share a single record and at most one generation.
+    """
+    keys = {n: normalize_food_name(n) for n in dict.fromkeys(n for n in names if n)}
+    by_key, errors_by_key, uncached = {}, {}, {}
+    for n, key in keys.items():
+        cached = food_cache.get(key)
+        if isinstance(cached, FoodLookupFailure):
+            errors_by_key[key] = cached.message
+        elif cached is not None:
+            by_key[key] = cached
+        elif key not in uncached:
+            uncached[key] = n
+
+    if uncached:
+        for key, doc in find_foods(list(uncached.values())).items():
+            by_key[key] = doc
+            food_cache.set(key, doc)
+    missing = {key: n for key, n in uncached.items() if key not in by_key}
+
+    if missing:
+        # Flights stay open until the bulk upsert lands, so a POST /food for one
+        # of these names waits for this batch instead of generating it again.
+        led, joined = food_flight.claim(missing)
+        outcomes, generated = {}, {}
+        try:
+            if led:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(led))) as pool:
+                    futures = {key: pool.submit(generate_nutrition, missing[key]) for key in led}
+                for key, future in futures.items():
+                    try:
+                        outcomes[key] = generated[key] = future.result()
+                    except Exception as e:
+                        outcomes[key] = e
+                if generated:
+                    outcomes.update(store_foods(generated))
+        except BaseException as e:
+            outcomes.update((key, e) for key in led if key in generated or key not in outcomes)
+            raise
+        finally:
+            for key in led:
+                if isinstance(outcomes[key], BaseException):
+                    food_flight.settle(key, exception=outcomes[key])
+                else:
+                    food_flight.settle(key, outcomes[key])
+        for key, future in joined.items():
+            try:
+                outcomes[key] = future.result()
+            except Exception as e:
+                outcomes[key] = e
+
+        for key, outcome in outcomes.items():
+            if isinstance(outcome, llm.LLMUnavailable):
+                errors_by_key[key] = f"Nutrition lookup unavailable: {outcome}"
+            elif isinstance(outcome, Exception):
+                errors_by_key[key] = f"Failed to get/parse nutrition: {outcome}"
+                food_cache.set(key, FoodLookupFailure(errors_by_key[key]), ttl=FOOD_FAILURE_TTL)
+            else:
+                by_key[key] = outcome
+                food_cache.set(key, outcome)
+
+    foods = {n: by_key[key] for n, key in keys.items() if key in by_key}
+    errors = {n: errors_by_key[key] for n, key in keys.items() if key in errors_by_key}
+    created = {n for n, key in keys.items() if key in missing and key in by_key}
+    return foods, errors, created
+
+@food_bp.route("", methods=["POST"])
+def get_or_create_food():
+    data = request.get_json()
+    name = data.get("name")
+    if not name:
+        return jsonify({"error": "Missing 'name' parameter"}), 400
+    key = normalize_food_name(name)
+    if not key:
+        return jsonify({"error": "Invalid 'name' parameter"}), 400
+
+    cached = food_cache.get(key)
+    if isinstance(cached, FoodLookupFailure):
+        return jsonify({"error": cached.message}), 500
+    if cached is not None:
+        return jsonify(cached), 200
+
+    existing = find_foods([name]).get(key)
+    if existing:
+        food_cache.set(key, existing)
+        return jsonify(existing), 200
+
+    try:
+        # The record is stored before the flight ends, so late arrivals find it in Mongo.
+        nutrition, _ = food_flight.do(key, lambda: store_foods({key: generate_nutrition(name)})[key])
+    except llm.LLMUnavailable as e:
+        # Overload, not a bad name: don't negative-cache it.
+        return jsonify({"error": f"Nutrition lookup unavailable: {e}"}), 503
     except Exception as e:
-        return jsonify({"error": f"Failed to get/parse nutrition: {e}"}), 500
+        message = f"Failed to get/parse nutrition: {e}"
+        food_cache.set(key, FoodLookupFailure(message), ttl=FOOD_FAILURE_TTL)
+        return jsonify({"error": message}), 500
 
-    mongo.db.foods.insert_one(nutrition)
-    nutrition.pop("_id",None)
+    food_cache.set(key, nutrition)
     return jsonify(nutrition), 201
+
+@food_bp.route("/batch", methods=["POST"])
+def get_or_create_foods():
+    """Resolve a list of names in one request; results keep the input order."""
+    data = request.get_json(silent=True) or {}
+    names = data.get("names")
+    if not isinstance(names, list) or not names:
+        return jsonify({"error": "Missing or invalid 'names' list"}), 400
+    if len(names) > FOOD_BATCH_MAX:
+        return jsonify({"error": f"At most {FOOD_BATCH_MAX} names per batch"}), 400
+
+    valid = [n for n in names if isinstance(n, str) and normalize_food_name(n)]
+    foods, errors, created = resolve_foods(valid)
+
+    results = []
+    for n in names:
+        if not isinstance(n, str):
+            results.append({"name": n, "status": "error", "error": "Invalid 'name' value"})
+        elif n in foods:
+            results.append({"name": n, "status": "created" if n in created else "found", "food": foods[n]})
+        elif n in errors:
+            results.append({"name": n, "status": "error", "error": errors[n]})
+        else:
+            results.append({"name": n, "status": "error", "error": "Invalid 'name' value"})
+    return jsonify({"results": results}), 200
+
+@food_bp.route("/cache/stats", methods=["GET"])
+def food_cache_stats():
+    return jsonify(dict(
+        food_cache.stats(),
+        coalesced_generations=food_flight.coalesced,
+        generations_in_flight=food_flight.in_flight(),
+    )), 200
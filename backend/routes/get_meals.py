@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from extensions import mongo
 from bson import ObjectId
+from services.meal_store import with_display_names
 import datetime
 
 get_meals_bp = Blueprint('get_meals', __name__, url_prefix='/api/user')
@@ -32,13 +33,15 @@ def get_user_meals(user_id):
         uid = ObjectId(user_id)
     except Exception:
         return jsonify({'message': 'Invalid user ID format.'}), 400
+    # lastBatchId is internal bookkeeping for POST /meals retries.
     cursor = mongo.db.meals.find({
         'userId': uid,
         'date':   {'$gte': start, '$lt': end}
-    })
+    }, {'lastBatchId': 0})
     meals = []
     for m in cursor:
         m['_id']      = str(m['_id'])
         m['userId']   = str(m['userId'])
+        m['mealsList'] = with_display_names(m.get('mealsList', []))
         meals.append(m)
     return jsonify({'meals': meals}), 200
\ No newline at end of file
@@ -0,0 +1,22 @@
+from flask import Blueprint, jsonify
+from extensions import mongo
+from services import readiness
+
+health_bp = Blueprint('health_bp', __name__)
+
+@health_bp.route('/health', methods=['GET'])
+def health():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "ok"}), 200
+
+@health_bp.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: background warmup has finished and MongoDB answers."""
+    is_ready, components = readiness.status()
+    try:
+        mongo.db.command("ping")
+        components["mongo"] = {"ready": True, "error": None}
+    except Exception as e:
+        components["mongo"] = {"ready": False, "error": str(e)}
+        is_ready = False
+    return jsonify({"ready": is_ready, "components": components}), 200 if is_ready else 503
@@ -4,30 +4,36 @@ import uuid
 from bson import ObjectId
 from flask import Blueprint, request, jsonify,redirect
 from extensions import mongo
-import boto3
 from dotenv import load_dotenv
+from services.storage import get_s3, R2_BUCKET_NAME, R2_PUBLIC_URL
+from services.meal_store import (
+    append_entries, apply_batch, batch_day_update, entry_changes, new_entry_id, serialize_day,
+)
 from datetime import datetime
 
 load_dotenv()
 
 meals_bp = Blueprint("meals_bp", __name__, url_prefix="/meals")
 
-s3 = boto3.client('s3',
-    endpoint_url=os.getenv('R2_ENDPOINT_URL'),
-    aws_access_key_id=os.getenv('R2_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('R2_SECRET_ACCESS_KEY'),
-    region_name='auto'
-)
-R2_BUCKET_NAME = os.getenv('R2_BUCKET_NAME')
-R2_PUBLIC_URL  = os.getenv('R2_PUBLIC_URL', '')
-
-if not R2_BUCKET_NAME:
-    raise RuntimeError("Missing R2_BUCKET_NAME environment variable")
+MEALS_BATCH_MAX = int(os.getenv("MEALS_BATCH_MAX", "200"))
 
 def _parse_iso(dt_str: str) -> datetime:
     """Parse ISO8601 strings, allowing trailing Z."""
     return datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
 
+def _new_entry(m):
+    """A stored entry (with a fresh id) from a posted meal; raises on bad input."""
+    return {
+        "id":       new_entry_id(),
+        "items":    m.get("items"),
+        "time":     _parse_iso(m["time"]),
+        "calories": float(m.get("calories", 0)),
+        "fat":      float(m.get("fat", 0)),
+        "protein":  float(m.get("protein", 0)),
+        "carbo":    float(m.get("carbo", 0)),
+        "imageUri": m.get("imageUri")
+    }
+
 @meals_bp.route("/upload", methods=["POST"])
 def upload_image():
     """Accept a single file upload, store it in R2, and return its public URL."""
@@ -40,6 +46,7 @@ def upload_image():
             filename = f"{uuid.uuid4()}-{img.filename}"
         else:
             return jsonify({"error": "No image file provided"}), 400
+        s3 = get_s3()
         s3.put_object(
             Bucket=R2_BUCKET_NAME,
             Key=filename,
@@ -71,7 +78,7 @@ def get_image(filename):
         if R2_PUBLIC_URL:
             return redirect(f"{R2_PUBLIC_URL.rstrip('/')}/{filename}")
         else:
-            url = s3.generate_presigned_url(
+            url = get_s3().generate_presigned_url(
                 'get_object',
                 Params={'Bucket': R2_BUCKET_NAME, 'Key': filename},
                 ExpiresIn=3600
@@ -104,61 +111,94 @@ def post_meal():
     except:
         return jsonify({"error": "Invalid date format"}), 400
 
-    existing = mongo.db.meals.find_one({
-        "userId": user_oid,
-        "date":   day
-    })
-    start_idx = len(existing.get("mealsList", [])) if existing else 0
+    try:
+        totals = {"totalCalories": float(total_cal or 0), "totalFat": float(total_fat or 0),
+                  "totalProtein": float(total_pro or 0), "totalCarbo": float(total_carb or 0)}
+    except (TypeError, ValueError):
+        return jsonify({"error": "Totals must be numbers"}), 400
 
     new_entries = []
-    for idx, m in enumerate(meals_list, start=1):
+    for m in meals_list:
         try:
-            tm = _parse_iso(m["time"])
-            seq = start_idx + idx
-            entry = {
-                "name":     f"Meal {seq}",
-                "items":    m.get("items"),
-                "time":     tm,
-                "calories": float(m.get("calories", 0)),
-                "fat":      float(m.get("fat", 0)),
-                "protein":  float(m.get("protein", 0)),
-                "carbo":    float(m.get("carbo", 0)),
-                "imageUri": m.get("imageUri")
-            }
+            entry = _new_entry(m)
         except:
             return jsonify({"error": "Invalid mealsList entry"}), 400
         new_entries.append(entry)
 
-    if existing:
-        mongo.db.meals.update_one(
-            {"_id": existing["_id"]},
-            {
-                "$inc": {
-                    "totalCalories": total_cal,
-                    "totalFat":      total_fat,
-                    "totalProtein":  total_pro,
-                    "totalCarbo":    total_carb,
-                },
-                "$push": {"mealsList": {"$each": new_entries}}
-            }
-        )
-    else:
-        doc = {
-            "userId":        user_oid,
-            "date":          day,
-            "totalCalories": total_cal,
-            "totalFat":      total_fat,
-            "totalProtein":  total_pro,
-            "totalCarbo":    total_carb,
-            "mealsList":     new_entries
-        }
-        mongo.db.meals.insert_one(doc)
-
-    updated = mongo.db.meals.find_one({ "userId": user_oid, "date": day })
-    updated["_id"]    = str(updated["_id"])
-    updated["userId"] = str(updated["userId"])
-    updated["date"]   = updated["date"].isoformat()
-    for item in updated.get("mealsList", []):
-        item["time"] = item["time"].isoformat()
-
-    return jsonify(updated), 200
+    # One atomic round trip; "Meal N" names are derived from position on read.
+    updated = append_entries(mongo.db.meals, user_oid, day, new_entries, totals)
+    return jsonify(serialize_day(updated)), 200
+
+@meals_bp.route("/batch", methods=["POST"])
+def batch_meals():
+    """Apply add/update/delete operations across one or more days in one bulk_write.
+
+    Body: {"userId", "operations": [{"op": "add", "date", "meal"},
+    {"op": "update", "date", "entryId", "mealData"}, {"op": "delete", "date", "entryId"}]}.
+    Each day's operations apply together or not at all; the response has every
+    touched day once, with its status and the document as it now stands.
+    """
+    data       = request.get_json(force=True, silent=True) or {}
+    user_id    = data.get("userId")
+    operations = data.get("operations")
+
+    if not (user_id and isinstance(operations, list) and operations):
+        return jsonify({"error": "Missing or invalid fields"}), 400
+    if len(operations) > MEALS_BATCH_MAX:
+        return jsonify({"error": f"At most {MEALS_BATCH_MAX} operations per batch"}), 400
+
+    try:
+        user_oid = ObjectId(user_id)
+    except:
+        return jsonify({"error": "Invalid userId"}), 400
+
+    # Group by day, keeping first-seen order; any bad operation rejects the whole batch.
+    days = {}
+    for n, op in enumerate(operations):
+        if not isinstance(op, dict):
+            return jsonify({"error": f"operations[{n}]: not an object"}), 400
+        try:
+            day = datetime.strptime(op.get("date") or "", "%d/%m/%Y")
+        except ValueError:
+            return jsonify({"error": f"operations[{n}]: invalid date format"}), 400
+        plan = days.setdefault(day, {"date": op["date"], "adds": [], "updates": {}, "deletes": []})
+        kind = op.get("op")
+        if kind == "add":
+            try:
+                plan["adds"].append(_new_entry(op["meal"]))
+            except:
+                return jsonify({"error": f"operations[{n}]: invalid meal"}), 400
+            continue
+        if kind not in ("update", "delete"):
+            return jsonify({"error": f"operations[{n}]: op must be add, update or delete"}), 400
+        entry_id = op.get("entryId")
+        if not (isinstance(entry_id, str) and entry_id):
+            return jsonify({"error": f"operations[{n}]: entryId is required"}), 400
+        if entry_id in plan["updates"] or entry_id in plan["deletes"]:
+            return jsonify({"error": f"operations[{n}]: entry {entry_id} is already changed in this batch"}), 400
+        if kind == "delete":
+            plan["deletes"].append(entry_id)
+            continue
+        try:
+            plan["updates"][entry_id] = entry_changes(op.get("mealData") or {})
+        except ValueError:
+            return jsonify({"error": f"operations[{n}]: invalid mealData values"}), 400
+
+    batch_id = new_entry_id()
+    ops = [batch_day_update(user_oid, day, batch_id, plan["adds"], plan["updates"], plan["deletes"])
+           for day, plan in days.items()]
+    all_applied, errors = apply_batch(mongo.db.meals, ops)
+
+    docs = {doc["date"]: doc for doc in mongo.db.meals.find({"userId": user_oid, "date": {"$in": list(days)}})}
+    results = []
+    for n, (day, plan) in enumerate(days.items()):
+        doc = docs.get(day)
+        result = {"date": plan["date"], "status": "applied"}
+        if n in errors:
+            result.update(status="failed", error=errors[n])
+        elif not all_applied and (doc is None or doc.get("lastBatchId") != batch_id):
+            # The filter didn't match: the day or one of its referenced entries is gone.
+            result.update(status="failed", error="Meal day or entry not found")
+        result["meal"] = serialize_day(doc) if doc else None
+        results.append(result)
+    return jsonify({"days": results}), 200
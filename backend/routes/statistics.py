@@ -54,7 +54,7 @@ def get_user_meals_and_goals(user_id):
     meals_cursor = mongo.db.meals.find({
         'userId': user_oid,
         'date': {'$gte': start_date, '$lte': end_date}
-    }).sort('date', 1)
+    }, {'lastBatchId': 0}).sort('date', 1)
     
     meals_data = []
     for meal_doc in meals_cursor:
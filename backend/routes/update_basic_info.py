@@ -1,27 +1,14 @@
-import os
 from bson import ObjectId
 from flask import Blueprint, request, jsonify
 from extensions import mongo
-import boto3
 from dotenv import load_dotenv
+from services.storage import get_s3, R2_BUCKET_NAME, R2_PUBLIC_URL
 import uuid
 
 load_dotenv()
 
 update_basic_info_bp = Blueprint("update_basic_info_bp", __name__, url_prefix="/api")
 
-s3 = boto3.client('s3',
-    endpoint_url=os.getenv('R2_ENDPOINT_URL'),
-    aws_access_key_id=os.getenv('R2_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('R2_SECRET_ACCESS_KEY'),
-    region_name='auto'
-)
-R2_BUCKET_NAME = os.getenv('R2_BUCKET_NAME')
-R2_PUBLIC_URL = os.getenv('R2_PUBLIC_URL', '')
-
-if not R2_BUCKET_NAME:
-    raise RuntimeError("Missing R2_BUCKET_NAME environment variable")
-
 @update_basic_info_bp.route("/update_basic_info", methods=["POST"])
 def update_basic_info():
     data = request.form.to_dict()
@@ -54,6 +41,7 @@ def update_basic_info():
             filename = f"{uuid.uuid4()}-{img.filename}"
             
             try:
+                s3 = get_s3()
                 s3.put_object(
                     Bucket=R2_BUCKET_NAME,
                     Key=filename,
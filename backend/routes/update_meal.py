@@ -1,17 +1,24 @@
 from flask import Blueprint, request, jsonify
 from extensions import mongo
 from bson import ObjectId
+from services.meal_store import (
+    TOTAL_FIELDS, apply_to_entry, entry_changes, entry_ref, miss_reason, update_entry_pipeline,
+    with_display_names,
+)
 
 update_meal_bp = Blueprint('update_meal', __name__, url_prefix='/api/user')
 
 @update_meal_bp.route('/<user_id>/update_meal', methods=['PUT'])
 def update_user_meal(user_id):
     meal_id = request.json.get('mealId')
+    entry_id = request.json.get('entryId')
     meal_name = request.json.get('mealName')
     updated_meal_data = request.json.get('mealData')
     
-    if not meal_id or not meal_name or not updated_meal_data:
-        return jsonify({'message': 'Missing required fields: mealId, mealName, and mealData'}), 400
+    # Entries are addressed by entryId; "Meal N" names from older clients still work.
+    ref = entry_ref(entry_id, meal_name)
+    if not meal_id or not ref or not isinstance(updated_meal_data, dict):
+        return jsonify({'message': 'Missing required fields: mealId, entryId or mealName, and mealData'}), 400
     
     try:
         uid = ObjectId(user_id)
@@ -19,59 +26,26 @@ def update_user_meal(user_id):
     except Exception:
         return jsonify({'message': 'Invalid ID format.'}), 400
     
-    meal_doc = mongo.db.meals.find_one({'_id': mid, 'userId': uid})
-    
+    try:
+        changes = entry_changes(updated_meal_data)
+    except ValueError:
+        return jsonify({'message': 'Invalid mealData values'}), 400
+
+    # One atomic server-side update: merge the entry and recompute totals in place.
+    meal_doc = apply_to_entry(mongo.db.meals, mid, uid, ref, update_entry_pipeline(ref, changes))
+
     if not meal_doc:
-        return jsonify({'message': 'Meal not found or not authorized'}), 404
-    
-    if 'mealsList' not in meal_doc:
-        return jsonify({'message': 'mealsList not found in this meal document'}), 400
-    
-    updated_meals_list = meal_doc['mealsList'].copy()
-    meal_found = False
-    
-    for i, meal in enumerate(updated_meals_list):
-        if meal.get('name') == meal_name:
-            # Update the meal with new data
-            updated_meals_list[i].update({
-                'calories': round(float(updated_meal_data.get('calories', 0)), 1),
-                'protein': round(float(updated_meal_data.get('protein', 0)), 1),
-                'carbo': round(float(updated_meal_data.get('carbo', 0)), 1),
-                'fat': round(float(updated_meal_data.get('fat', 0)), 1),
-                'items': updated_meal_data.get('items', ''),
-            })
-            meal_found = True
-            break
-    
-    if not meal_found:
+        missing = miss_reason(mongo.db.meals, mid, uid)
+        if missing == 'day':
+            return jsonify({'message': 'Meal not found or not authorized'}), 404
+        if missing == 'mealsList':
+            return jsonify({'message': 'mealsList not found in this meal document'}), 400
+        if 'id' in ref:
+            return jsonify({'message': f'Meal entry "{entry_id}" not found in mealsList'}), 404
         return jsonify({'message': f'Meal with name "{meal_name}" not found in mealsList'}), 404
-    
-    total_calories = round(sum(meal.get('calories', 0) for meal in updated_meals_list), 1)
-    total_fat = round(sum(meal.get('fat', 0) for meal in updated_meals_list), 1)
-    total_protein = round(sum(meal.get('protein', 0) for meal in updated_meals_list), 1)
-    total_carbo = round(sum(meal.get('carbo', 0) for meal in updated_meals_list), 1)
-    
-    update_result = mongo.db.meals.update_one(
-        {'_id': mid},
-        {'$set': {
-            'mealsList': updated_meals_list,
-            'totalCalories': total_calories,
-            'totalFat': total_fat,
-            'totalProtein': total_protein,
-            'totalCarbo': total_carbo
-        }}
-    )
-    
-    if update_result.modified_count == 0:
-        return jsonify({'message': 'Failed to update meal document'}), 500
-    
+
     return jsonify({
         'message': 'Meal updated successfully',
-        'updatedMealsList': updated_meals_list,
-        'totals': {
-            'totalCalories': total_calories,
-            'totalFat': total_fat,
-            'totalProtein': total_protein,
-            'totalCarbo': total_carbo
-        }
-    }), 200 
\ No newline at end of file
+        'updatedMealsList': with_display_names(meal_doc['mealsList']),
+        'totals': {field: meal_doc[field] for field in TOTAL_FIELDS}
+    }), 200 
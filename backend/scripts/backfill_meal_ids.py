@@ -0,0 +1,76 @@
+"""Give every stored meal entry an immutable id.
+
+Entries logged before ids existed are addressed only by their "Meal N" name.
+This assigns an id to each entry that lacks one and drops the stored name,
+which is now derived from the entry's position when documents are read.
+Each document is rewritten only if its mealsList is unchanged since it was
+read, so running this next to live traffic loses no edits; documents edited
+in between are reported and picked up by the next run.
+
+Run from the backend directory:
+
+    python scripts/backfill_meal_ids.py --dry-run
+    python scripts/backfill_meal_ids.py --batch-size 500
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import certifi
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from services.meal_store import new_entry_id
+
+
+def backfilled(meals_list):
+    out = []
+    for entry in meals_list:
+        entry = {k: v for k, v in entry.items() if k != "name"}
+        entry.setdefault("id", new_entry_id())
+        out.append(entry)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign ids to meal entries that lack one")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="count documents without writing")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI"), tlsCAFile=certifi.where()).get_default_database()
+
+    query = {"mealsList": {"$elemMatch": {"id": {"$exists": False}}}}
+    if args.dry_run:
+        print(f"{db.meals.count_documents(query)} documents have entries without ids")
+        return
+
+    scanned = updated = 0
+    ops = []
+
+    def flush():
+        nonlocal updated
+        if ops:
+            updated += db.meals.bulk_write(ops, ordered=False).modified_count
+            ops.clear()
+
+    for doc in db.meals.find(query, {"mealsList": 1}):
+        scanned += 1
+        ops.append(UpdateOne(
+            {"_id": doc["_id"], "mealsList": doc["mealsList"]},
+            {"$set": {"mealsList": backfilled(doc["mealsList"])}},
+        ))
+        if len(ops) >= args.batch_size:
+            flush()
+    flush()
+
+    print(f"{updated} of {scanned} documents backfilled")
+    if updated < scanned:
+        print(f"{scanned - updated} changed while running; run again to pick them up")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Merge duplicate foods documents that differ only in spelling.
+
+Every document is grouped by normalize_food_name(name); the oldest document in
+each group becomes the canonical record and receives the group's key, and the
+rest are deleted. Documents whose name normalizes to an empty key (blank or
+punctuation-only names) are left untouched and listed for manual review rather
+than merged into one another. An optional JSON alias map merges true synonyms as well, e.g.
+{"aubergine": "eggplant", "courgette": "zucchini"}.
+
+Run from the backend directory:
+
+    python scripts/dedupe_foods.py --dry-run
+    python scripts/dedupe_foods.py --aliases aliases.json
+"""
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import certifi
+from dotenv import load_dotenv
+from pymongo import DeleteMany, MongoClient, UpdateOne
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from indexes import ensure_indexes
+from services.food_names import normalize_food_name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicate the foods collection")
+    parser.add_argument("--aliases", help="JSON file mapping alias names to canonical names")
+    parser.add_argument("--dry-run", action="store_true", help="report the merge plan without writing")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI"), tlsCAFile=certifi.where()).get_default_database()
+
+    alias_map = {}
+    if args.aliases:
+        raw = json.loads(Path(args.aliases).read_text())
+        alias_map = {normalize_food_name(a): normalize_food_name(c) for a, c in raw.items()}
+
+    groups = defaultdict(list)
+    skipped = []
+    for doc in db.foods.find({}, {"name": 1, "key": 1, "aliases": 1}).sort("_id", 1):
+        key = normalize_food_name(doc.get("name", ""))
+        if not key:
+            skipped.append(doc)
+            continue
+        groups[alias_map.get(key, key)].append((key, doc))
+
+    ops, duplicate_ids = [], []
+    for canonical, members in groups.items():
+        keep = members[0][1]
+        aliases = {k for k, _ in members if k != canonical}
+        aliases.update(a for a, c in alias_map.items() if c == canonical)
+        aliases.update(keep.get("aliases", []))
+        duplicate_ids.extend(doc["_id"] for _, doc in members[1:])
+        if keep.get("key") != canonical or set(keep.get("aliases", [])) != aliases:
+            ops.append(UpdateOne({"_id": keep["_id"]}, {"$set": {"key": canonical, "aliases": sorted(aliases)}}))
+        if len(members) > 1:
+            names = ", ".join(doc.get("name", "?") for _, doc in members)
+            print(f"{canonical!r}: keeping {keep.get('name')!r}, merging [{names}]")
+
+    for doc in skipped:
+        print(f"skipping {doc['_id']}: name {doc.get('name')!r} has no usable key")
+    print(f"{len(groups)} canonical foods, {len(duplicate_ids)} duplicates, {len(ops)} records to update, "
+          f"{len(skipped)} skipped")
+    if args.dry_run:
+        return
+    if duplicate_ids:
+        ops.append(DeleteMany({"_id": {"$in": duplicate_ids}}))
+    if ops:
+        db.foods.bulk_write(ops, ordered=False)
+    ensure_indexes(db)
+
+
+if __name__ == "__main__":
+    main()
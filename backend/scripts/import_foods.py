@@ -0,0 +1,142 @@
+"""Bulk-load a local nutrition table into the foods collection.
+
+Streams a CSV or JSONL file row by row and writes batched bulk_write upserts
+keyed on normalize_food_name(name), producing the same document shape as
+POST /food (name, unit, piece_avg_weight, avg_gram, cal, protein, fat,
+carbohydrates per 100 g). Existing records are left alone unless --overwrite
+is given. Progress is checkpointed after every batch, so an interrupted import
+resumes where it stopped when rerun with the same arguments.
+
+Run from the backend directory:
+
+    python scripts/import_foods.py foods.csv
+    python scripts/import_foods.py usda.jsonl --map description=name --map energy_kcal=cal
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import certifi
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from indexes import ensure_indexes
+from services.food_names import display_name, normalize_food_name
+
+NUMERIC_FIELDS = ("cal", "protein", "fat", "carbohydrates")
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _number(value):
+    if value in (None, ""):
+        return None
+    return float(value)
+
+
+def to_food(row, mapping):
+    """Convert one input row to a foods document, or None if it is unusable."""
+    row = {mapping.get(k, k): v for k, v in row.items()}
+    name = display_name(str(row.get("name") or ""))
+    key = normalize_food_name(name)
+    if not key:
+        return None
+    try:
+        values = {field: _number(row.get(field)) for field in NUMERIC_FIELDS}
+        piece = _number(row.get("piece_avg_weight"))
+        serving = _number(row.get("avg_gram"))
+    except (TypeError, ValueError):
+        return None
+    if any(v is None for v in values.values()):
+        return None
+
+    unit = (row.get("unit") or ("piece" if piece else "gram")).strip().lower()
+    if unit not in ("piece", "gram"):
+        return None
+    return {
+        "name": name,
+        "unit": unit,
+        "piece_avg_weight": piece if unit == "piece" else None,
+        "avg_gram": (serving or 100.0) if unit == "gram" else None,
+        **values,
+        "key": key,
+    }
+
+
+def flush(db, batch, overwrite):
+    if not batch:
+        return 0, 0
+    ops = []
+    for key, doc in batch.items():
+        fields = {k: v for k, v in doc.items() if k != "key"}
+        if overwrite:
+            update = {"$set": fields, "$setOnInsert": {"aliases": []}}
+        else:
+            update = {"$setOnInsert": dict(fields, aliases=[])}
+        ops.append(UpdateOne({"key": key}, update, upsert=True))
+    result = db.foods.bulk_write(ops, ordered=False)
+    return result.upserted_count, result.modified_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a nutrition dataset into foods")
+    parser.add_argument("path", type=Path, help="CSV or JSONL file")
+    parser.add_argument("--map", action="append", default=[], metavar="SRC=DST",
+                        help="rename an input column to a foods field (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--overwrite", action="store_true", help="replace values of existing records")
+    parser.add_argument("--checkpoint", type=Path, help="resume state file (default: <path>.import-state.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    args = parser.parse_args()
+
+    mapping = dict(m.split("=", 1) for m in args.map)
+    checkpoint = args.checkpoint or args.path.with_name(args.path.name + ".import-state.json")
+    done = 0
+    if checkpoint.exists() and not args.restart:
+        done = json.loads(checkpoint.read_text()).get("rows_done", 0)
+        print(f"Resuming after row {done}")
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI"), tlsCAFile=certifi.where()).get_default_database()
+    ensure_indexes(db)
+
+    rows = skipped = inserted = updated = 0
+    batch = {}
+    start = time.perf_counter()
+    for rows, row in enumerate(read_rows(args.path), start=1):
+        if rows <= done:
+            continue
+        doc = to_food(row, mapping)
+        if doc is None:
+            skipped += 1
+        elif args.overwrite or doc["key"] not in batch:
+            batch[doc["key"]] = doc
+        if len(batch) >= args.batch_size:
+            i, u = flush(db, batch, args.overwrite)
+            inserted, updated, batch = inserted + i, updated + u, {}
+            checkpoint.write_text(json.dumps({"rows_done": rows}))
+            rate = (rows - done) / (time.perf_counter() - start)
+            print(f"{rows} rows, {inserted} inserted, {updated} updated, {skipped} skipped ({rate:.0f} rows/s)")
+
+    i, u = flush(db, batch, args.overwrite)
+    inserted, updated = inserted + i, updated + u
+    checkpoint.write_text(json.dumps({"rows_done": rows, "complete": True}))
+    elapsed = time.perf_counter() - start
+    print(f"Done: {rows} rows, {inserted} inserted, {updated} updated, {skipped} skipped in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
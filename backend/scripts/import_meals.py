@@ -0,0 +1,167 @@
+"""Bulk-import historical meal logs into the meals collection.
+
+Streams a CSV or JSONL file row by row (one logged meal per row) and groups
+rows by (userId, date) into the same day documents POST /meals produces: a
+mealsList of entries with ids, plus totals. Only --batch-size rows are held in
+memory at a time; each batch is written as one unordered bulk_write of upserts
+that append to the day's mealsList and recompute its totals, so a day split
+across batches (or already holding meals) just accumulates.
+
+Each entry's id is a hash of the row's content (userId, date, time, items,
+nutrients, imageUri), and the upsert appends only entries whose id the day
+doesn't hold yet. Rerunning an import, resuming after a crash mid-batch or
+importing an overlapping export therefore logs nothing twice, whatever the
+files are called. Rows identical in every one of those fields are the same
+meal and are imported once. Progress is checkpointed after every batch like
+scripts/import_foods.py.
+
+Columns: userId (or --user-id for a single-user file), date (dd/mm/YYYY or
+YYYY-MM-DD; taken from time if absent), time (ISO 8601), items, calories, fat,
+protein, carbo, imageUri.
+
+Run from the backend directory:
+
+    python scripts/import_meals.py history.csv --user-id 64b7f0c2e4b0a1a2b3c4d5e6
+    python scripts/import_meals.py export.jsonl --map kcal=calories --map carbs=carbo
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import certifi
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from indexes import ensure_indexes
+from services.meal_store import ENTRY_FIELDS, append_missing_pipeline
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _number(value):
+    if value in (None, ""):
+        return 0.0
+    return float(value)
+
+
+def _day(value):
+    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value.strip(), fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"unrecognised date {value!r}")
+
+
+def entry_id(user_oid, day, entry):
+    """Stable id from the entry's content, so the same meal always gets the same id."""
+    content = [str(user_oid), day.isoformat(), entry["time"].isoformat(), entry["items"],
+               *(entry[field] for field in ENTRY_FIELDS), entry["imageUri"]]
+    return hashlib.sha256(json.dumps(content).encode()).hexdigest()[:32]
+
+
+def to_entry(row, mapping, default_user):
+    """Convert one input row to ``(userId, day, entry)``, or None if it is unusable."""
+    row = {mapping.get(k, k): v for k, v in row.items()}
+    user_id = row.get("userId") or default_user
+    if not user_id:
+        return None
+    try:
+        user_oid = ObjectId(user_id)
+        tm = datetime.fromisoformat(str(row["time"]).replace("Z", "+00:00"))
+        day = _day(row["date"]) if row.get("date") else datetime(tm.year, tm.month, tm.day)
+        values = {field: _number(row.get(field)) for field in ENTRY_FIELDS}
+    except Exception:
+        return None
+    entry = {
+        "items":    row.get("items"),
+        "time":     tm,
+        **values,
+        "imageUri": row.get("imageUri") or None,
+    }
+    return user_oid, day, dict({"id": entry_id(user_oid, day, entry)}, **entry)
+
+
+def flush(db, batch):
+    """Write each buffered day's new entries; returns (day writes that changed something, days that already held every entry)."""
+    if not batch:
+        return 0, 0
+    ops = [
+        UpdateOne({"userId": user_oid, "date": day}, append_missing_pipeline(entries.values()), upsert=True)
+        for (user_oid, day), entries in batch.items()
+    ]
+    result = db.meals.bulk_write(ops, ordered=False)
+    return result.modified_count + result.upserted_count, result.matched_count - result.modified_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import historical meal logs into meals")
+    parser.add_argument("path", type=Path, help="CSV or JSONL file")
+    parser.add_argument("--user-id", help="userId for rows that don't carry one")
+    parser.add_argument("--map", action="append", default=[], metavar="SRC=DST",
+                        help="rename an input column to a meal field (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows buffered per bulk_write")
+    parser.add_argument("--checkpoint", type=Path, help="resume state file (default: <path>.import-state.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    args = parser.parse_args()
+
+    mapping = dict(m.split("=", 1) for m in args.map)
+    checkpoint = args.checkpoint or args.path.with_name(args.path.name + ".import-state.json")
+    done = 0
+    if checkpoint.exists() and not args.restart:
+        done = json.loads(checkpoint.read_text()).get("rows_done", 0)
+        print(f"Resuming after row {done}")
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI"), tlsCAFile=certifi.where()).get_default_database()
+    ensure_indexes(db)
+
+    rows = buffered = skipped = days = already = 0
+    batch = {}
+    start = time.perf_counter()
+    for rows, row in enumerate(read_rows(args.path), start=1):
+        if rows <= done:
+            continue
+        parsed = to_entry(row, mapping, args.user_id)
+        if parsed is None:
+            skipped += 1
+            continue
+        user_oid, day, entry = parsed
+        # Keyed by id: a repeated row within the batch is the same meal.
+        batch.setdefault((user_oid, day), {})[entry["id"]] = entry
+        buffered += 1
+        if buffered >= args.batch_size:
+            d, a = flush(db, batch)
+            days, already, batch, buffered = days + d, already + a, {}, 0
+            checkpoint.write_text(json.dumps({"rows_done": rows}))
+            rate = (rows - done) / (time.perf_counter() - start)
+            print(f"{rows} rows, {days} day writes, {already} unchanged (already imported), {skipped} skipped "
+                  f"({rate:.0f} rows/s)")
+
+    d, a = flush(db, batch)
+    days, already = days + d, already + a
+    checkpoint.write_text(json.dumps({"rows_done": rows, "complete": True}))
+    elapsed = time.perf_counter() - start
+    rate = (rows - done) / elapsed if elapsed else 0
+    print(f"Done: {rows} rows, {days} day writes, {already} unchanged (already imported), {skipped} skipped "
+          f"in {elapsed:.1f}s ({rate:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
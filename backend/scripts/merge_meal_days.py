@@ -0,0 +1,63 @@
+"""Merge duplicate meals documents for the same user and day.
+
+Before POST /meals became a single upsert, two concurrent posts could each
+insert a document for the same (userId, date), and the unique meals_user_date
+index can't be built while such duplicates exist. For every duplicated day
+the oldest document keeps the concatenated mealsList (in creation order of the
+documents) and the summed totals; the rest are deleted.
+
+Run from the backend directory:
+
+    python scripts/merge_meal_days.py --dry-run
+    python scripts/merge_meal_days.py
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import certifi
+from dotenv import load_dotenv
+from pymongo import DeleteMany, MongoClient, UpdateOne
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from indexes import ensure_indexes
+from services.meal_store import TOTAL_FIELDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge duplicate (userId, date) meals documents")
+    parser.add_argument("--dry-run", action="store_true", help="report the merge plan without writing")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db = MongoClient(os.getenv("MONGO_URI"), tlsCAFile=certifi.where()).get_default_database()
+
+    duplicated = db.meals.aggregate([
+        {"$group": {"_id": {"userId": "$userId", "date": "$date"}, "ids": {"$push": "$_id"}, "n": {"$sum": 1}}},
+        {"$match": {"n": {"$gt": 1}}},
+    ], allowDiskUse=True)
+
+    ops, duplicate_ids = [], []
+    for group in duplicated:
+        docs = list(db.meals.find({"_id": {"$in": group["ids"]}}).sort("_id", 1))
+        keep = docs[0]
+        meals_list = [entry for doc in docs for entry in doc.get("mealsList", [])]
+        totals = {field: sum(doc.get(field, 0) for doc in docs) for field in TOTAL_FIELDS}
+        ops.append(UpdateOne({"_id": keep["_id"]}, {"$set": dict(totals, mealsList=meals_list)}))
+        duplicate_ids.extend(doc["_id"] for doc in docs[1:])
+        print(f"user {group['_id']['userId']} {group['_id']['date']:%Y-%m-%d}: "
+              f"merging {len(docs)} documents, {len(meals_list)} entries")
+
+    print(f"{len(ops)} duplicated days, {len(duplicate_ids)} documents to delete")
+    if args.dry_run:
+        return
+    if duplicate_ids:
+        ops.append(DeleteMany({"_id": {"$in": duplicate_ids}}))
+    if ops:
+        db.meals.bulk_write(ops, ordered=True)
+    ensure_indexes(db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Make sure every YOLO class label has a canonical foods record.
+
+Loads the detection model, resolves all of its class names through the food
+pipeline (generating any missing records with the LLM) and reports labels
+that could not be resolved. Run once per new best.pt, from the backend
+directory:
+
+    python scripts/seed_yolo_foods.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app import app
+from routes import detect
+
+
+def main():
+    with app.app_context():
+        missing = detect.load_class_nutrition(generate=True)
+    total = len(detect.model_names())
+    print(f"{total - len(missing)}/{total} YOLO classes have nutrition records")
+    for label in missing:
+        print(f"  missing: {label}")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
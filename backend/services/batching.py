@@ -0,0 +1,96 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class BatchScheduler:
+    """Collect images from concurrent requests and run them through the model in batches.
+
+    A single background thread calls ``infer_batch``; callers running several
+    schedulers over one model must serialize ``infer_batch`` themselves. Each batch is closed as soon as it
+    holds ``max_batch_size`` images or ``max_wait_ms`` has passed since its first
+    image arrived, whichever comes first.
+    """
+
+    def __init__(self, infer_batch, max_batch_size=8, max_wait_ms=10):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.infer_batch = infer_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches_run = 0
+        self.images_run = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="yolo-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, img, timeout=None):
+        """Queue one image and block until its result is ready."""
+        self.start()
+        future = Future()
+        self._queue.put((img, future))
+        return future.result(timeout=timeout)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches_run": self.batches_run,
+            "images_run": self.images_run,
+            "avg_batch_size": (self.images_run / self.batches_run) if self.batches_run else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            live = [(img, f) for img, f in batch if f.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            images = [img for img, _ in live]
+            futures = [f for _, f in live]
+            try:
+                results = list(self.infer_batch(images))
+                if len(results) != len(images):
+                    raise RuntimeError(
+                        f"Model returned {len(results)} results for a batch of {len(images)}"
+                    )
+            except Exception as e:
+                for f in futures:
+                    f.set_exception(e)
+                continue
+            self.batches_run += 1
+            self.images_run += len(images)
+            for f, res in zip(futures, results):
+                f.set_result(res)
+
+
+def scheduler_from_env(infer_batch):
+    """Build a scheduler configured from DETECT_MAX_BATCH and DETECT_MAX_WAIT_MS."""
+    return BatchScheduler(
+        infer_batch,
+        max_batch_size=int(os.getenv("DETECT_MAX_BATCH", "8")),
+        max_wait_ms=float(os.getenv("DETECT_MAX_WAIT_MS", "10")),
+    )
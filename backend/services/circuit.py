@@ -0,0 +1,78 @@
+"""Circuit breaker for a slow or failing upstream.
+
+After ``failure_threshold`` consecutive failures the breaker opens and
+``allow()`` returns False for ``cooldown`` seconds, so callers skip the
+upstream instead of spending their latency budget on it. Then one trial call
+is let through (half-open): success closes the breaker, failure re-opens it.
+Calls that succeed but take longer than ``slow_after`` seconds count as
+failures, so sustained slowness trips it as well as errors.
+"""
+import threading
+import time
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, cooldown=30.0, slow_after=None):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.slow_after = slow_after
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self.opened = 0
+        self.short_circuited = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        """Whether a call may go out now; in half-open only one trial at a time."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def release(self):
+        """Give back an ``allow()`` whose call was never made, without recording an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, ok, elapsed=None):
+        """Report the outcome of a call that ``allow()`` let through."""
+        if ok and self.slow_after is not None and elapsed is not None and elapsed > self.slow_after:
+            ok = False
+        with self._lock:
+            self._trial_in_flight = False
+            if ok:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    self.opened += 1
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self._state(),
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "short_circuited": self.short_circuited,
+            }
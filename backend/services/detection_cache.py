@@ -0,0 +1,74 @@
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+from services.cache import LRUTTLCache
+
+KINDS = ("yolo", "vision")
+
+
+def image_digest(data: bytes) -> str:
+    """Exact content key for the uploaded bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(img) -> int:
+    """64-bit difference hash of a decoded BGR image; robust to re-encoding and resizing."""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class DetectionCache:
+    """Detection results keyed by image content, with separate entries for YOLO and Vision.
+
+    Lookups first try the SHA-256 of the raw upload. When perceptual matching is
+    enabled, a miss can still be served by a stored entry whose dHash lies within
+    ``max_distance`` bits of the new image.
+    """
+
+    def __init__(self, maxsize=2048, ttl=24 * 3600.0, use_phash=False, max_distance=4):
+        self.use_phash = use_phash
+        self.max_distance = max_distance
+        self._caches = {kind: LRUTTLCache(maxsize, ttl) for kind in KINDS}
+        self._phashes = {kind: LRUTTLCache(maxsize, ttl) for kind in KINDS}
+        self.near_hits = {kind: 0 for kind in KINDS}
+
+    def get(self, kind, digest):
+        return self._caches[kind].get(digest)
+
+    def get_near(self, kind, phash):
+        """Return a result stored for a visually near-identical image, if any."""
+        if not self.use_phash:
+            return None
+        for other_digest, other_phash in self._phashes[kind].items():
+            if bin(phash ^ other_phash).count("1") <= self.max_distance:
+                value = self._caches[kind].get(other_digest)
+                if value is not None:
+                    self.near_hits[kind] += 1
+                    return value
+        return None
+
+    def set(self, kind, digest, value, phash=None):
+        self._caches[kind].set(digest, value)
+        if self.use_phash and phash is not None:
+            self._phashes[kind].set(digest, phash)
+
+    def stats(self):
+        return {
+            kind: dict(self._caches[kind].stats(), near_hits=self.near_hits[kind])
+            for kind in KINDS
+        }
+
+
+def cache_from_env():
+    """Build a cache configured from the DETECT_CACHE_* environment variables."""
+    return DetectionCache(
+        maxsize=int(os.getenv("DETECT_CACHE_SIZE", "2048")),
+        ttl=float(os.getenv("DETECT_CACHE_TTL", str(24 * 3600))),
+        use_phash=os.getenv("DETECT_CACHE_PHASH", "0") == "1",
+        max_distance=int(os.getenv("DETECT_CACHE_PHASH_DISTANCE", "4")),
+    )
@@ -0,0 +1,51 @@
+import re
+import unicodedata
+
+# Words that end in "s" without being plurals.
+_KEEP_S = {"hummus", "couscous", "asparagus", "molasses", "citrus", "swiss", "bass", "hash", "series"}
+_ES_AFTER = ("ch", "sh", "x", "ss", "z", "o")
+
+
+def _singular(word: str) -> str:
+    if len(word) <= 3 or word in _KEEP_S or word.endswith(("ss", "us")):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("es") and word[:-2].endswith(_ES_AFTER):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def _strip_latin_accents(text: str) -> str:
+    """Drop combining marks that follow a Latin letter ("é" -> "e"), keeping those other
+    scripts need: kana voicing marks, Indic vowel signs, Hebrew points."""
+    out = []
+    for c in unicodedata.normalize("NFKD", text):
+        if unicodedata.combining(c) and out and out[-1].isascii():
+            continue
+        out.append(c)
+    return unicodedata.normalize("NFC", "".join(out))
+
+
+def normalize_food_name(name: str) -> str:
+    """Canonical lookup key for a food name.
+
+    Case, Latin accents, punctuation, repeated whitespace and simple English
+    plurals are folded so "Bananas", "banana " and "BANANA!" share one key.
+    Letters, digits and marks of every script are kept, so "寿司" and "אורז"
+    get keys of their own. Keys are never shown to users; "cookie" and
+    "cookies" both become "cooky".
+    """
+    text = _strip_latin_accents(name or "").casefold()
+    text = re.sub(r"[-_/]+", " ", text)
+    text = "".join(c for c in text if c == " " or unicodedata.category(c)[0] in "LNM")
+    words = [_singular(w) if w.isascii() else w for w in text.split()]
+    words = [w[:-2] + "y" if w.isascii() and w.endswith("ie") and len(w) > 3 else w for w in words]
+    return " ".join(words)
+
+
+def display_name(name: str) -> str:
+    """Tidy a user-supplied name for storage as the canonical record's display name."""
+    return " ".join((name or "").split())
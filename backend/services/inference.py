@@ -0,0 +1,212 @@
+"""YOLO inference backends.
+
+``best.pt`` can be served through the default PyTorch path or exported to
+ONNX (optionally INT8-quantized) or OpenVINO, which are usually faster on our
+CPU-only hosts. Pick one with YOLO_BACKEND=pytorch|onnx|openvino and
+YOLO_INT8=1. Serving processes (gunicorn workers, DETECT_WORKERS processes)
+only load an existing artifact, so several of them starting at once never
+export over each other; export once per deployment beforehand:
+
+    python -m services.inference export onnx --int8
+
+A missing artifact or a load failure falls back to PyTorch.
+
+Compare backends on real photos before switching a deployment:
+
+    python -m services.inference compare photo1.jpg photo2.jpg --backends onnx openvino --int8
+"""
+import argparse
+import os
+import statistics
+import time
+from pathlib import Path
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+WEIGHTS = os.getenv("YOLO_WEIGHTS", "best.pt")
+DEFAULT_IMGSZ = int(os.getenv("YOLO_IMGSZ", "640"))
+
+
+def export_path(backend, weights=WEIGHTS, int8=False) -> Path:
+    """Where Ultralytics (or our quantizer) puts the artifact for ``backend``."""
+    stem = Path(weights).with_suffix("")
+    if backend == "onnx":
+        return Path(f"{stem}.int8.onnx" if int8 else f"{stem}.onnx")
+    if backend == "openvino":
+        return Path(f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model")
+    return Path(weights)
+
+
+def export_model(backend, weights=WEIGHTS, int8=False, imgsz=DEFAULT_IMGSZ, force=False) -> Path:
+    """Export ``weights`` for ``backend`` unless the artifact already exists."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown YOLO backend '{backend}', expected one of {BACKENDS}")
+    target = export_path(backend, weights, int8)
+    if backend == "pytorch" or (target.exists() and not force):
+        return target
+
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    if backend == "onnx":
+        # Dynamic axes so the batch scheduler can send more than one image per call.
+        fp32 = Path(model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True))
+        if int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            # Quantize next to the target and rename, so a reader never sees a partial file.
+            partial = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+            quantize_dynamic(str(fp32), str(partial), weight_type=QuantType.QUInt8)
+            os.replace(partial, target)
+    else:
+        exported = model.export(
+            format="openvino",
+            imgsz=imgsz,
+            dynamic=True,
+            int8=int8,
+            data=os.getenv("YOLO_CALIBRATION_DATA") if int8 else None,
+        )
+        target = Path(exported)
+    return target
+
+
+def load_model(backend=None, weights=WEIGHTS, int8=None):
+    """Return a YOLO model on the requested backend, falling back to PyTorch.
+
+    Never exports: a backend whose artifact doesn't exist yet is skipped.
+    """
+    from ultralytics import YOLO
+
+    backend = (backend or os.getenv("YOLO_BACKEND", "pytorch")).lower()
+    int8 = os.getenv("YOLO_INT8", "0") == "1" if int8 is None else int8
+    if backend != "pytorch":
+        try:
+            if backend not in BACKENDS:
+                raise ValueError(f"expected one of {BACKENDS}")
+            target = export_path(backend, weights, int8)
+            if not target.exists():
+                raise FileNotFoundError(
+                    f"{target} not found; run `python -m services.inference export {backend}"
+                    f"{' --int8' if int8 else ''}` first"
+                )
+            model = YOLO(str(target), task="detect")
+            model.backend_name = f"{backend}-int8" if int8 else backend
+            return model
+        except Exception as e:
+            print(f"YOLO backend '{backend}' unavailable ({e}), falling back to PyTorch")
+    model = YOLO(weights)
+    model.backend_name = "pytorch"
+    return model
+
+
+def model_input_size(model) -> int:
+    return int(getattr(model, "overrides", {}).get("imgsz") or DEFAULT_IMGSZ)
+
+
+def _detections(model, img, conf=0.25):
+    res = model(img, conf=conf, verbose=False)[0]
+    out = []
+    for box in getattr(res, "boxes", []):
+        out.append((int(box.cls[0]), float(box.conf[0]), [float(v) for v in box.xyxy[0]]))
+    return out
+
+
+def _iou(a, b):
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def parity(reference, candidate, iou_threshold=0.5):
+    """Match candidate detections to the reference by class and IoU.
+
+    Returns (matched, reference_count, candidate_count, mean |Δconfidence| of matches).
+    """
+    unused = list(candidate)
+    deltas = []
+    for cls, conf, box in reference:
+        best = max(
+            (c for c in unused if c[0] == cls),
+            key=lambda c: _iou(box, c[2]),
+            default=None,
+        )
+        if best is not None and _iou(box, best[2]) >= iou_threshold:
+            unused.remove(best)
+            deltas.append(abs(conf - best[1]))
+    return len(deltas), len(reference), len(candidate), (statistics.mean(deltas) if deltas else 0.0)
+
+
+def _latency(model, images, runs):
+    for img in images[:2]:
+        model(img, verbose=False)
+    timings = []
+    for _ in range(runs):
+        for img in images:
+            start = time.perf_counter()
+            model(img, verbose=False)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(0.95 * (len(timings) - 1))]
+
+
+def compare(image_paths, backends, int8=False, runs=5):
+    import cv2
+
+    images = [cv2.imread(str(p)) for p in image_paths]
+    images = [img for img in images if img is not None]
+    if not images:
+        raise SystemExit("No readable images given")
+
+    reference = load_model("pytorch")
+    ref_dets = [_detections(reference, img) for img in images]
+    rows = [("pytorch", *_latency(reference, images, runs), 1.0, 0.0)]
+    for backend in backends:
+        try:
+            export_model(backend, int8=int8)
+        except Exception as e:
+            print(f"Export for '{backend}' failed: {e}")
+            continue
+        model = load_model(backend, int8=int8)
+        if model.backend_name == "pytorch":
+            continue
+        matched = total = 0
+        deltas = []
+        for img, ref in zip(images, ref_dets):
+            m, r, _, d = parity(ref, _detections(model, img))
+            matched, total = matched + m, total + r
+            if m:
+                deltas.append(d)
+        recall = matched / total if total else 1.0
+        rows.append((model.backend_name, *_latency(model, images, runs), recall,
+                     statistics.mean(deltas) if deltas else 0.0))
+
+    print(f"{'backend':<16}{'p50 ms':>10}{'p95 ms':>10}{'recall':>10}{'|Δconf|':>10}")
+    for name, p50, p95, recall, delta in rows:
+        print(f"{name:<16}{p50:>10.1f}{p95:>10.1f}{recall:>10.3f}{delta:>10.4f}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export best.pt and compare inference backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="export weights for a backend")
+    exp.add_argument("backend", choices=BACKENDS[1:])
+    exp.add_argument("--int8", action="store_true")
+    exp.add_argument("--force", action="store_true")
+
+    cmp_ = sub.add_parser("compare", help="accuracy parity and latency against PyTorch")
+    cmp_.add_argument("images", nargs="+")
+    cmp_.add_argument("--backends", nargs="+", choices=BACKENDS[1:], default=list(BACKENDS[1:]))
+    cmp_.add_argument("--int8", action="store_true")
+    cmp_.add_argument("--runs", type=int, default=5)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        print(export_model(args.backend, int8=args.int8, force=args.force))
+    else:
+        compare(args.images, args.backends, int8=args.int8, runs=args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Shared OpenAI client, created on first use.
+
+Every route talks to OpenAI through ``chat()``, which adds what the SDK alone
+does not give us across threads:
+
+- one pooled HTTP transport (LLM_MAX_CONNECTIONS, LLM_KEEPALIVE) so
+  connections are reused instead of re-handshaking per request;
+- a per-call deadline (LLM_TIMEOUT seconds by default, or an explicit
+  ``deadline`` from ``deadline_in()``) that bounds the wait for a slot, every
+  attempt and every backoff sleep together;
+- bounded retries (LLM_MAX_RETRIES) with full-jitter exponential backoff for
+  timeouts, connection errors, 429s and 5xx;
+- a process-wide semaphore (LLM_MAX_IN_FLIGHT) so a burst of fallbacks or
+  food generations queues here instead of piling up sockets and workers.
+
+Importing this module does not import ``openai``; ``llm.OpenAIError`` and
+``llm.APITimeoutError`` are resolved lazily, so ``except llm.OpenAIError``
+only pulls the SDK in when an exception is actually being matched.
+"""
+import os
+import random
+import threading
+import time
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.25"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "4"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", str(LLM_MAX_IN_FLIGHT)))
+LLM_KEEPALIVE = float(os.getenv("LLM_KEEPALIVE", "30"))
+
+_client = None
+_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(LLM_MAX_IN_FLIGHT)
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0, "in_flight": 0}
+
+
+class LLMUnavailable(RuntimeError):
+    """The deadline ran out: no free slot, or no time left for another attempt.
+
+    ``attempts`` is how many requests actually went out to OpenAI first; 0 means
+    the call gave up locally (saturated semaphore, or the deadline was already spent).
+    """
+
+    def __init__(self, message, attempts=0):
+        super().__init__(message)
+        self.attempts = attempts
+
+
+def _http_client():
+    from openai import DefaultHttpxClient
+
+    # openai>=3 builds on its httpx fork (httpx2); older releases on httpx itself.
+    try:
+        from httpx2 import Limits
+    except ImportError:
+        from httpx import Limits
+    return DefaultHttpxClient(limits=Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE,
+    ))
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                api_key = os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    raise RuntimeError("Please set OPENAI_API_KEY in your .env file")
+                from openai import OpenAI
+                # Retries happen in chat(), where they can respect the caller's deadline.
+                _client = OpenAI(
+                    api_key=api_key,
+                    max_retries=0,
+                    timeout=LLM_TIMEOUT,
+                    http_client=_http_client(),
+                )
+    return _client
+
+
+def deadline_in(seconds):
+    """An absolute deadline ``seconds`` from now, for ``chat(deadline=...)``."""
+    return time.monotonic() + seconds
+
+
+def _retryable(error):
+    import openai
+
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def is_upstream_failure(error):
+    """True for errors that say OpenAI itself is unhealthy: timeouts, connection errors and 5xx."""
+    import openai
+
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _count(key, n=1):
+    with _stats_lock:
+        _stats[key] += n
+
+
+def chat(deadline=None, **kwargs):
+    """``chat.completions.create(**kwargs)`` under the shared deadline, retry and concurrency policy.
+
+    Raises LLMUnavailable when no slot frees up or no time is left before
+    ``deadline``; OpenAI errors from the last attempt propagate unchanged.
+    """
+    deadline = deadline if deadline is not None else deadline_in(LLM_TIMEOUT)
+    if not _slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+        _count("rejected")
+        raise LLMUnavailable("Too many OpenAI requests in flight")
+    _count("in_flight")
+    try:
+        client = get_client()
+        attempt = 0
+        last_error = None
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                _count("failures")
+                raise LLMUnavailable("OpenAI deadline exceeded", attempts=attempt) from last_error
+            _count("calls")
+            try:
+                return client.chat.completions.create(timeout=remaining, **kwargs)
+            except Exception as e:
+                if attempt >= LLM_MAX_RETRIES or not _retryable(e):
+                    _count("failures")
+                    raise
+                last_error = e
+            attempt += 1
+            _count("retries")
+            backoff = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+            time.sleep(min(backoff, max(0.0, deadline - time.monotonic())))
+    finally:
+        _count("in_flight", -1)
+        _slots.release()
+
+
+def stats():
+    with _stats_lock:
+        return dict(_stats, max_in_flight=LLM_MAX_IN_FLIGHT)
+
+
+def __getattr__(name):
+    if name in ("OpenAIError", "APITimeoutError"):
+        import openai
+        return getattr(openai, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
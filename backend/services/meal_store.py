@@ -0,0 +1,246 @@
+"""Server-side updates for day documents in the meals collection.
+
+One document per (userId, date) holds that day's ``mealsList`` and running
+totals. Each entry carries an immutable ``id`` assigned when it is logged;
+its "Meal N" display name is derived from its position when the document is
+read (``with_display_names``) and is not stored, so deleting an entry
+renumbers nothing. Edits are aggregation-pipeline updates (MongoDB 4.2+), so
+totals are recomputed by the server against the document as it is at write
+time, in the same atomic operation as the edit itself.
+"""
+import re
+import uuid
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+TOTAL_FIELDS = ("totalCalories", "totalFat", "totalProtein", "totalCarbo")
+# Per-entry field summed into each total, in TOTAL_FIELDS order.
+ENTRY_FIELDS = ("calories", "fat", "protein", "carbo")
+
+_DISPLAY_NAME = re.compile(r"Meal ([1-9][0-9]*)")
+
+
+def new_entry_id():
+    return uuid.uuid4().hex
+
+
+def entry_ref(entry_id=None, name=None):
+    """How a request addresses an entry: {"id": ...}, or {"index": ...} from a legacy "Meal N" name.
+
+    Returns None when neither is usable; an unparseable name gets index None,
+    which matches nothing.
+    """
+    if isinstance(entry_id, str) and entry_id:
+        return {"id": entry_id}
+    if isinstance(name, str) and name:
+        match = _DISPLAY_NAME.fullmatch(name.strip())
+        return {"index": int(match.group(1)) - 1 if match else None}
+    return None
+
+
+def _entry_filter(ref):
+    if "id" in ref:
+        return {"mealsList.id": ref["id"]}
+    return {f"mealsList.{ref['index']}": {"$exists": True}}
+
+
+def _is_target(ref):
+    """Aggregation condition on $$m (the entry) and $$i (its position) selecting ``ref``."""
+    if "id" in ref:
+        return {"$eq": ["$$m.id", {"$literal": ref["id"]}]}
+    return {"$eq": ["$$i", ref["index"]]}
+
+
+def entry_changes(meal_data):
+    """The fields an edit may change, rounded to one decimal; raises ValueError on bad values."""
+    try:
+        return {
+            "calories": round(float(meal_data.get("calories", 0)), 1),
+            "protein": round(float(meal_data.get("protein", 0)), 1),
+            "carbo": round(float(meal_data.get("carbo", 0)), 1),
+            "fat": round(float(meal_data.get("fat", 0)), 1),
+            "items": meal_data.get("items", ""),
+        }
+    except (TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"Invalid mealData values: {e}")
+
+
+def _totals_stage():
+    """Recompute every total from mealsList, rounded to one decimal like the edit routes always did."""
+    return {"$set": {
+        field: {"$round": [{"$sum": f"$mealsList.{entry_field}"}, 1]}
+        for field, entry_field in zip(TOTAL_FIELDS, ENTRY_FIELDS)
+    }}
+
+
+def update_entry_pipeline(ref, changes):
+    """Pipeline update merging ``changes`` into the entry ``ref`` and recomputing totals."""
+    literal_changes = {field: {"$literal": value} for field, value in changes.items()}
+    return [
+        {"$set": {"mealsList": {"$map": {
+            "input": {"$range": [0, {"$size": "$mealsList"}]},
+            "as": "i",
+            "in": {"$let": {
+                "vars": {"m": {"$arrayElemAt": ["$mealsList", "$$i"]}},
+                "in": {"$cond": [_is_target(ref), {"$mergeObjects": ["$$m", literal_changes]}, "$$m"]},
+            }},
+        }}}},
+        _totals_stage(),
+    ]
+
+
+def delete_entry_pipeline(ref):
+    """Pipeline update removing the entry ``ref`` and recomputing totals."""
+    if "id" in ref:
+        remaining = {"$filter": {
+            "input": "$mealsList",
+            "as": "m",
+            "cond": {"$ne": ["$$m.id", {"$literal": ref["id"]}]},
+        }}
+    else:
+        index = ref["index"]
+        remaining = {"$concatArrays": [
+            {"$slice": ["$mealsList", index]} if index else [],
+            {"$slice": ["$mealsList", index + 1, {"$size": "$mealsList"}]},
+        ]}
+    return [{"$set": {"mealsList": remaining}}, _totals_stage()]
+
+
+def append_missing_pipeline(entries):
+    """Pipeline update appending those of ``entries`` whose id the day doesn't hold yet, then recomputing totals.
+
+    Safe to repeat: re-applying the same entries changes nothing. Works as an
+    upsert on a day that doesn't exist yet.
+    """
+    existing = {"$ifNull": ["$mealsList", []]}
+    missing = {"$filter": {
+        "input": {"$literal": list(entries)},
+        "as": "e",
+        "cond": {"$not": [{"$in": ["$$e.id", {"$ifNull": ["$mealsList.id", []]}]}]},
+    }}
+    return [{"$set": {"mealsList": {"$concatArrays": [existing, missing]}}}, _totals_stage()]
+
+
+def batch_day_update(user_oid, day, batch_id, adds=(), updates=None, deletes=()):
+    """One UpdateOne applying a day's share of a batch: updates, then deletes, then adds.
+
+    The filter requires every entry the day's operations reference, so either
+    all of them apply or none do. Days with only adds are upserted. The write
+    stamps ``lastBatchId`` so the caller can tell afterwards which days applied.
+    """
+    updates = updates or {}
+    referenced = list(updates) + list(deletes)
+    entries = {"$ifNull": ["$mealsList", []]}
+    if updates:
+        entries = {"$map": {"input": entries, "as": "m", "in": {"$switch": {
+            "branches": [
+                {"case": {"$eq": ["$$m.id", {"$literal": entry_id}]},
+                 "then": {"$mergeObjects": ["$$m", {"$literal": changes}]}}
+                for entry_id, changes in updates.items()
+            ],
+            "default": "$$m",
+        }}}}
+    if deletes:
+        entries = {"$filter": {"input": entries, "as": "m", "cond": {
+            "$not": [{"$in": [{"$ifNull": ["$$m.id", None]}, {"$literal": list(deletes)}]}],
+        }}}
+    if adds:
+        entries = {"$concatArrays": [entries, {"$literal": list(adds)}]}
+    query = {"userId": user_oid, "date": day}
+    if referenced:
+        query["mealsList.id"] = {"$all": referenced}
+    pipeline = [{"$set": {"mealsList": entries, "lastBatchId": batch_id}}, _totals_stage()]
+    return UpdateOne(query, pipeline, upsert=not referenced)
+
+
+def apply_batch(collection, ops):
+    """Run day updates in one unordered bulk_write.
+
+    Returns ``(all_applied, errors)`` where errors maps an op index to the
+    server's message for ops that raised. Ops that lost a first-of-the-day
+    insert race (duplicate key) are retried once as updates.
+    """
+    errors = {}
+    try:
+        result = collection.bulk_write(ops, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        result = e.details
+        retry = []
+        for err in e.details.get("writeErrors", []):
+            if err.get("code") == 11000:
+                retry.append(err["index"])
+            else:
+                errors[err["index"]] = err.get("errmsg", "write failed")
+        if retry:
+            try:
+                retried = collection.bulk_write([ops[i] for i in retry], ordered=False).bulk_api_result
+            except BulkWriteError as e2:
+                retried = e2.details
+                for err in e2.details.get("writeErrors", []):
+                    errors[retry[err["index"]]] = err.get("errmsg", "write failed")
+            result = dict(result, nMatched=result["nMatched"] + retried["nMatched"],
+                          nUpserted=result["nUpserted"] + retried["nUpserted"])
+    applied = result["nMatched"] + result["nUpserted"]
+    return applied == len(ops) and not errors, errors
+
+
+def apply_to_entry(collection, meal_oid, user_oid, ref, pipeline):
+    """Run ``pipeline`` on the day document if it has the entry ``ref``; the document after, or None."""
+    if ref.get("index", 0) is None:
+        return None
+    return collection.find_one_and_update(
+        dict({"_id": meal_oid, "userId": user_oid}, **_entry_filter(ref)),
+        pipeline,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def miss_reason(collection, meal_oid, user_oid):
+    """Why apply_to_entry() matched nothing: "day", "mealsList" or "entry" is missing.
+
+    Only runs on the failure path, so successful edits stay one round trip.
+    """
+    meal_doc = collection.find_one({"_id": meal_oid, "userId": user_oid}, {"mealsList": {"$slice": 0}})
+    if not meal_doc:
+        return "day"
+    if "mealsList" not in meal_doc:
+        return "mealsList"
+    return "entry"
+
+
+def append_entries(collection, user_oid, day, entries, totals):
+    """Append to the (user, day) document, creating it if needed; returns the document after the write."""
+    # Two first-of-the-day upserts can race to insert; the unique (userId, date)
+    # index lets only one win and the loser's retry then updates that document.
+    for attempt in range(2):
+        try:
+            return collection.find_one_and_update(
+                {"userId": user_oid, "date": day},
+                {"$push": {"mealsList": {"$each": entries}}, "$inc": totals},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            if attempt:
+                raise
+
+
+def with_display_names(entries):
+    """Entries with their derived "Meal N" name (position in the day, from 1)."""
+    return [dict({"name": f"Meal {i}"}, **{k: v for k, v in entry.items() if k != "name"})
+            for i, entry in enumerate(entries, start=1)]
+
+
+def serialize_day(doc):
+    """A day document as JSON-ready values (string ids, ISO dates, display names)."""
+    doc = dict(doc)
+    doc.pop("lastBatchId", None)
+    doc["_id"] = str(doc["_id"])
+    doc["userId"] = str(doc["userId"])
+    doc["date"] = doc["date"].isoformat()
+    doc["mealsList"] = [
+        dict(item, time=item["time"].isoformat()) if hasattr(item.get("time"), "isoformat") else item
+        for item in with_display_names(doc.get("mealsList", []))
+    ]
+    return doc
@@ -0,0 +1,95 @@
+import bisect
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+# Upper bounds in milliseconds; the last bucket is open-ended.
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; cheap enough to update on every request."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        idx = bisect.bisect_left(self.buckets, ms)
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.total += ms
+            self.max = max(self.max, ms)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (0 < q <= 1)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return float(self.buckets[idx]) if idx < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max, 3),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class StageMetrics:
+    """Per-stage latency histograms and event counters for one pipeline."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = buckets
+        self.histograms = {}
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, stage, ms):
+        hist = self.histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(stage, Histogram(self.buckets))
+        hist.observe(ms)
+        if has_request_context():
+            g.setdefault("stage_timings", []).append((stage, ms))
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def snapshot(self):
+        return {
+            "stages": {stage: h.snapshot() for stage, h in self.histograms.items()},
+            "counters": dict(self.counters),
+        }
+
+
+def server_timing_header(timings):
+    """Format [(stage, ms), ...] as a Server-Timing header value."""
+    return ", ".join(f"{stage};dur={ms:.2f}" for stage, ms in timings)
@@ -0,0 +1,90 @@
+import io
+import os
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# cv2 can decode JPEGs at 1/2, 1/4 or 1/8 scale straight from the DCT coefficients,
+# which avoids materialising the full 12MP frame only to have YOLO letterbox it down.
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "1024"))
+VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+
+
+def image_size(data: bytes):
+    """Return (width, height) from the image header without decoding pixels, or None."""
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            return im.size
+    except Exception:
+        return None
+
+
+def reduction_for(size, target_side: int) -> int:
+    """Largest decode reduction that keeps the long side at or above ``target_side``."""
+    if not size:
+        return 1
+    long_side = max(size)
+    for factor, _ in _REDUCED_FLAGS:
+        if long_side // factor >= target_side:
+            return factor
+    return 1
+
+
+def decode_for_model(data: bytes, target_side: int):
+    """Decode upload bytes at the smallest scale the model can still use at full input size.
+
+    Returns ``(img, stats)``; ``img`` is None when the bytes are not a decodable image.
+    """
+    start = time.perf_counter()
+    size = image_size(data)
+    factor = reduction_for(size, target_side)
+    flag = dict(_REDUCED_FLAGS).get(factor, cv2.IMREAD_COLOR)
+    npimg = np.frombuffer(data, np.uint8)
+    img = cv2.imdecode(npimg, flag)
+    if img is None and factor != 1:
+        factor = 1
+        img = cv2.imdecode(npimg, cv2.IMREAD_COLOR)
+    stats = {
+        "upload_bytes": len(data),
+        "source_size": list(size) if size else None,
+        "decode_factor": factor,
+        "decode_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+    if img is not None:
+        full_pixels = size[0] * size[1] if size else img.shape[0] * img.shape[1]
+        stats["decoded_size"] = [img.shape[1], img.shape[0]]
+        stats["decoded_bytes"] = int(img.nbytes)
+        stats["decode_bytes_saved"] = int(full_pixels * 3 - img.nbytes)
+    return img, stats
+
+
+def encode_for_vision(img, stats=None, original: bytes = None, max_side: int = VISION_MAX_SIDE,
+                      quality: int = VISION_JPEG_QUALITY) -> bytes:
+    """A compact JPEG for the Vision payload.
+
+    When the upload is a JPEG that needs no downscaling, its own bytes are sent
+    if they are no larger than a re-encode: that avoids a second lossy pass.
+    """
+    h, w = img.shape[:2]
+    scale = max_side / max(h, w)
+    if scale < 1:
+        img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Failed to encode image for Vision")
+    payload = buf.tobytes()
+    if original is not None and original[:3] == b"\xff\xd8\xff" and len(original) <= len(payload):
+        size = image_size(original)
+        if size and max(size) <= max_side:
+            payload = original
+    if stats is not None:
+        stats["vision_bytes"] = len(payload)
+        stats["vision_bytes_saved"] = stats.get("upload_bytes", len(payload)) - len(payload)
+    return payload
@@ -0,0 +1,28 @@
+import threading
+
+_lock = threading.Lock()
+_components = {}
+
+
+def register(*names):
+    """Declare components that must finish warming up before the app reports ready."""
+    with _lock:
+        for name in names:
+            _components.setdefault(name, {"ready": False, "error": None})
+
+
+def mark_ready(name):
+    with _lock:
+        _components[name] = {"ready": True, "error": None}
+
+
+def mark_failed(name, error):
+    with _lock:
+        _components[name] = {"ready": False, "error": str(error)}
+
+
+def status():
+    """Return (all registered components ready, per-component state)."""
+    with _lock:
+        snapshot = {name: dict(state) for name, state in _components.items()}
+    return all(state["ready"] for state in snapshot.values()), snapshot
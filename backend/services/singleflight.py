@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for and share its result or exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Return ``(result, shared)``; ``shared`` is False only for the caller that ran ``fn``."""
+        led, joined = self.claim([key])
+        if not led:
+            return joined[key].result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            self.settle(key, exception=e)
+            raise
+        self.settle(key, result)
+        return result, False
+
+    def claim(self, keys):
+        """Start flights for several keys at once, for callers that resolve them together.
+
+        Returns ``(led, joined)``: the keys this caller now leads and must
+        :meth:`settle`, and ``{key: Future}`` for keys already in flight.
+        """
+        led, joined = [], {}
+        with self._lock:
+            for key in keys:
+                future = self._calls.get(key)
+                if future is None:
+                    self._calls[key] = Future()
+                    led.append(key)
+                else:
+                    joined[key] = future
+                    self.coalesced += 1
+        return led, joined
+
+    def settle(self, key, result=None, exception=None):
+        """End a flight started by :meth:`claim`, handing waiters its result or exception."""
+        with self._lock:
+            future = self._calls.pop(key)
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
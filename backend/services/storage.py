@@ -0,0 +1,30 @@
+"""Cloudflare R2 (S3 API) client shared by the upload routes, created on first use."""
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+R2_BUCKET_NAME = os.getenv('R2_BUCKET_NAME')
+R2_PUBLIC_URL = os.getenv('R2_PUBLIC_URL', '')
+
+_s3 = None
+_lock = threading.Lock()
+
+
+def get_s3():
+    global _s3
+    if _s3 is None:
+        with _lock:
+            if _s3 is None:
+                if not R2_BUCKET_NAME:
+                    raise RuntimeError("Missing R2_BUCKET_NAME environment variable")
+                import boto3
+                _s3 = boto3.client('s3',
+                    endpoint_url=os.getenv('R2_ENDPOINT_URL'),
+                    aws_access_key_id=os.getenv('R2_ACCESS_KEY_ID'),
+                    aws_secret_access_key=os.getenv('R2_SECRET_ACCESS_KEY'),
+                    region_name='auto'
+                )
+    return _s3
@@ -0,0 +1,290 @@
+"""Multi-process YOLO detection pool.
+
+Each worker process loads its own model, so detection and its Python
+post-processing run outside the web process's GIL. Decoded images travel
+through pre-allocated shared-memory slots; only the slot index, shape and
+the small result lists are pickled.
+
+Every worker has its own duplex pipe for tasks and results; nothing is
+shared between workers, so a worker killed at any point (OOM kill, segfault
+in the runtime) cannot leave a queue lock held for the others. One
+supervisor thread waits on all pipes and process sentinels: it resolves
+results as they arrive, and when a worker dies it fails every task sent to
+that worker, returns their slots and starts a replacement.
+"""
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import cv2
+import numpy as np
+
+
+def _worker_main(conn, slot_names, backend, threads):
+    from services.inference import load_model, model_input_size
+
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    try:
+        model = load_model(backend)
+        conn.send(("ready", (dict(model.names), model_input_size(model))))
+    except Exception as e:
+        conn.send(("ready", e))
+        return
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        task_id, slot, shape, kwargs = task
+        try:
+            img = np.ndarray(shape, dtype=np.uint8, buffer=slots[slot].buf)
+            res = model(img, verbose=False, **kwargs)[0]
+            detections = [
+                {"label": model.names[int(box.cls[0])], "confidence": float(box.conf[0])}
+                for box in getattr(res, "boxes", [])
+            ]
+            conn.send((task_id, detections))
+        except Exception as e:
+            conn.send((task_id, e))
+    for shm in slots:
+        shm.close()
+
+
+class WorkerDied(RuntimeError):
+    pass
+
+
+class _Worker:
+    def __init__(self, proc, conn):
+        self.proc = proc
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.tasks = set()
+        self.ready = False
+
+
+class DetectionWorkerPool:
+    def __init__(self, num_workers, max_side=1280, backend=None, start_method="spawn", task_timeout=30.0):
+        self.num_workers = num_workers
+        self.max_side = max_side
+        self.backend = backend
+        self.task_timeout = task_timeout
+        self._ctx = mp.get_context(start_method)
+        self._slot_bytes = max_side * max_side * 3
+        self._slots = []
+        self._free = queue.Queue()
+        self._pending = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._closing = False
+        self.restarts = 0
+        self.names = {}
+        self.imgsz = None
+        self.started = False
+
+    def start(self, timeout=300):
+        with self._lock:
+            if self.started:
+                return
+            for i in range(self.num_workers * 2):
+                shm = shared_memory.SharedMemory(create=True, size=self._slot_bytes)
+                self._slots.append(shm)
+                self._free.put(i)
+            self._closing = False
+            self._workers = [self._spawn() for _ in range(self.num_workers)]
+            for worker in self._workers:
+                if not worker.conn.poll(timeout):
+                    self.shutdown()
+                    raise RuntimeError(f"Detection worker {worker.proc.pid} did not load its model in {timeout}s")
+                _, info = worker.conn.recv()
+                if isinstance(info, Exception):
+                    self.shutdown()
+                    raise RuntimeError(f"Detection worker {worker.proc.pid} failed to load model: {info}")
+                worker.ready = True
+                self.names, self.imgsz = info
+            threading.Thread(target=self._supervise, name="detect-pool-supervisor", daemon=True).start()
+            atexit.register(self.shutdown)
+            self.started = True
+
+    def _spawn(self):
+        threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+        parent_conn, child_conn = self._ctx.Pipe()
+        p = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, [shm.name for shm in self._slots], self.backend, threads),
+            daemon=True,
+        )
+        p.start()
+        child_conn.close()
+        return _Worker(p, parent_conn)
+
+    def _supervise(self):
+        """Resolve results from every worker; fail the tasks of any worker that dies and replace it."""
+        while not self._closing:
+            workers = list(self._workers)
+            try:
+                ready = wait([w.conn for w in workers] + [w.proc.sentinel for w in workers], timeout=1.0)
+            except OSError:
+                continue  # a pipe was closed by shutdown()
+            for index, worker in enumerate(workers):
+                if self._closing:
+                    return
+                # EOF on the pipe means the worker is gone even if its sentinel hasn't fired yet.
+                exited = worker.conn in ready and not self._receive(worker)
+                if exited or worker.proc.sentinel in ready:
+                    self._replace(index, worker)
+
+    def _receive(self, worker):
+        """Handle one message from ``worker``; False once its pipe is closed."""
+        try:
+            message = worker.conn.recv()
+        except (EOFError, OSError):
+            return False
+        if message[0] == "ready":
+            if isinstance(message[1], Exception):
+                print(f"Detection worker {worker.proc.pid} failed to load model: {message[1]}")
+            else:
+                worker.ready = True
+            return True
+        task_id, payload = message
+        worker.tasks.discard(task_id)
+        self._finish(task_id, payload)
+        return True
+
+    def _replace(self, index, worker):
+        worker.proc.join(timeout=1.0)  # reap it so exitcode is set
+        # Results it sent before dying are still valid.
+        try:
+            while worker.conn.poll() and self._receive(worker):
+                pass
+        except (EOFError, OSError):
+            pass
+        code = worker.proc.exitcode
+        print(f"Detection worker {worker.proc.pid} exited with code {code}; restarting")
+        for task_id in list(worker.tasks):
+            self._finish(task_id, WorkerDied(f"Detection worker {worker.proc.pid} exited with code {code}"))
+        worker.tasks.clear()
+        worker.conn.close()
+        # Brief pause so a worker that can't load its model doesn't respawn in a hot loop.
+        time.sleep(0.5)
+        with self._lock:
+            if self._closing:
+                return
+            self._workers[index] = self._spawn()
+            self.restarts += 1
+
+    def _finish(self, task_id, payload):
+        """Resolve a pending task and return its slot; a no-op if it was already resolved."""
+        entry = self._pending.pop(task_id, None)
+        if entry is None:
+            return
+        future, slot = entry
+        self._free.put(slot)
+        if isinstance(payload, Exception):
+            future.set_exception(payload)
+        else:
+            future.set_result(payload)
+
+    def _pick_worker(self):
+        """The least busy worker, preferring ones that have loaded their model."""
+        with self._lock:
+            workers = [w for w in self._workers if w.proc.is_alive()] or list(self._workers)
+        return min(workers, key=lambda w: (not w.ready, len(w.tasks)))
+
+    def submit(self, img, timeout=None, **kwargs):
+        """Run detection for one decoded BGR image in a worker; blocks for the result.
+
+        Waits at most ``timeout`` seconds (default: task_timeout) for a slot and
+        again for the result, raising TimeoutError.
+        """
+        self.start()
+        timeout = self.task_timeout if timeout is None else timeout
+        h, w = img.shape[:2]
+        if max(h, w) > self.max_side:
+            scale = self.max_side / max(h, w)
+            img = cv2.resize(img, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        img = np.ascontiguousarray(img, dtype=np.uint8)
+
+        try:
+            slot = self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free detection slot within {timeout}s")
+        task_id = next(self._ids)
+        future = Future()
+        np.ndarray(img.shape, dtype=np.uint8, buffer=self._slots[slot].buf)[...] = img
+        self._pending[task_id] = (future, slot)
+        worker = self._pick_worker()
+        worker.tasks.add(task_id)
+        try:
+            with worker.send_lock:
+                worker.conn.send((task_id, slot, img.shape, kwargs))
+        except (OSError, ValueError) as e:
+            worker.tasks.discard(task_id)
+            self._finish(task_id, WorkerDied(f"Detection worker unavailable: {e}"))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            # Give the slot back now; a late result for this task is then ignored. The
+            # task stays counted against the worker until it reports back, so new work
+            # goes to workers that aren't stuck.
+            self._finish(task_id, TimeoutError())
+            raise TimeoutError(f"Detection did not finish within {timeout}s")
+
+    def stats(self):
+        return {
+            "workers": self.num_workers,
+            "alive": sum(w.proc.is_alive() for w in self._workers),
+            "restarts": self.restarts,
+            "in_flight": len(self._pending),
+            "free_slots": self._free.qsize(),
+        }
+
+    def shutdown(self):
+        self._closing = True
+        for worker in self._workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except Exception:
+                pass
+        for worker in self._workers:
+            worker.proc.join(timeout=5)
+            if worker.proc.is_alive():
+                worker.proc.terminate()
+            worker.conn.close()
+        self._workers = []
+        for shm in self._slots:
+            shm.close()
+            shm.unlink()
+        self._slots = []
+        self.started = False
+
+
+def pool_from_env():
+    """Return a pool when DETECT_WORKERS > 0, otherwise None (detect in-process)."""
+    workers = int(os.getenv("DETECT_WORKERS", "0"))
+    if workers <= 0:
+        return None
+    return DetectionWorkerPool(
+        workers,
+        max_side=int(os.getenv("DETECT_POOL_MAX_SIDE", "1280")),
+        start_method=os.getenv("DETECT_POOL_START_METHOD", "spawn"),
+        task_timeout=float(os.getenv("DETECT_POOL_TIMEOUT", "30")),
+    )
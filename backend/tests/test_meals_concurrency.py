@@ -0,0 +1,108 @@
+"""Concurrency tests for POST /meals against a real MongoDB.
+
+The atomic upsert and the unique meals_user_date index being checked belong to
+the server, so these run only when TEST_MONGO_URI points at a disposable
+database and are skipped otherwise:
+
+    TEST_MONGO_URI=mongodb://localhost:27017/foodsmart_test python -m pytest tests
+"""
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from bson import ObjectId
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI")
+pytestmark = pytest.mark.skipif(not TEST_MONGO_URI, reason="TEST_MONGO_URI is not set")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+THREADS = 32
+ENTRIES = 2
+DAY = datetime(2000, 1, 1)
+
+
+@pytest.fixture(scope="module")
+def app_and_db():
+    # The built-in monkeypatch fixture is function-scoped; undo both on module teardown.
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("MONGO_URI", TEST_MONGO_URI)
+        mp.syspath_prepend(str(BACKEND_DIR))
+        from app import app
+        from extensions import mongo
+        from indexes import ensure_indexes
+
+        with app.app_context():
+            ensure_indexes(mongo.db)
+        yield app, mongo.db
+
+
+@pytest.fixture
+def user_id(app_and_db):
+    _, db = app_and_db
+    user_id = ObjectId()
+    yield user_id
+    db.meals.delete_many({"userId": user_id})
+
+
+def _race(fn, threads=THREADS):
+    barrier = threading.Barrier(threads)
+    results, errors = [], []
+
+    def run():
+        barrier.wait()
+        try:
+            results.append(fn())
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    assert not errors, errors
+    return results
+
+
+@pytest.mark.parametrize("round_no", range(5))
+def test_concurrent_posts_for_a_new_day_make_one_document(app_and_db, user_id, round_no):
+    app, db = app_and_db
+    client = app.test_client()
+    body = {
+        "userId": str(user_id),
+        "date": DAY.strftime("%d/%m/%Y"),
+        "totalCalories": 100 * ENTRIES,
+        "mealsList": [
+            {"time": "2000-01-01T12:00:00Z", "items": "race", "calories": 100}
+            for _ in range(ENTRIES)
+        ],
+    }
+
+    statuses = _race(lambda: client.post("/meals", json=body).status_code)
+
+    assert statuses == [200] * THREADS
+    docs = list(db.meals.find({"userId": user_id, "date": DAY}))
+    assert len(docs) == 1
+    ids = [entry["id"] for entry in docs[0]["mealsList"]]
+    assert len(ids) == len(set(ids)) == THREADS * ENTRIES
+    assert docs[0]["totalCalories"] == 100 * THREADS * ENTRIES
+
+
+def test_append_entries_retries_a_lost_insert_race(app_and_db, user_id):
+    _, db = app_and_db
+    from services.meal_store import append_entries, new_entry_id
+
+    def append():
+        entry = {"id": new_entry_id(), "time": DAY, "calories": 1.0, "fat": 0.0, "protein": 0.0, "carbo": 0.0}
+        totals = {"totalCalories": 1.0, "totalFat": 0.0, "totalProtein": 0.0, "totalCarbo": 0.0}
+        return append_entries(db.meals, user_id, DAY, [entry], totals)
+
+    docs = _race(append)
+
+    assert all(doc is not None for doc in docs)
+    assert len({doc["_id"] for doc in docs}) == 1
+    final = db.meals.find_one({"userId": user_id, "date": DAY})
+    assert len(final["mealsList"]) == THREADS
+    assert final["totalCalories"] == THREADS
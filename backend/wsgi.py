@@ -0,0 +1,82 @@
+"""Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+``app.py`` only starts the Flask debug server. Under gunicorn with
+``preload_app = True`` this module is imported once in the master: it creates
+indexes, loads the YOLO weights, runs warmup inferences and loads the
+class-nutrition table there, then freezes the heap before the workers are
+forked. Workers therefore share the model and read-only tables copy-on-write
+instead of each loading their own copy, and the first real request does not
+pay for graph initialization.
+
+Only the PyTorch backend is preloaded in the master. ONNX Runtime and OpenVINO
+sessions own thread pools that do not survive fork(), and the detection worker
+pool (DETECT_WORKERS > 0) owns processes and queues, so in those setups each
+worker warms up on its own after the fork; /ready reports progress either way.
+
+Check what the workers actually share with bench/bench_worker_memory.py
+(per-process RSS, PSS and shared/private bytes from /proc):
+
+    python bench/bench_worker_memory.py --pidfile /tmp/foodsmart-gunicorn.pid
+
+RSS counts shared pages in every worker, so compare PSS and Private: with
+preloading, Private per worker should stay small next to the model size.
+"""
+import gc
+import os
+
+import certifi
+from app import app, create_indexes
+from extensions import mongo
+from routes import detect
+from services import readiness
+
+PRELOAD = os.getenv("PRELOAD", "1") == "1"
+WARMUP_RUNS = int(os.getenv("WARMUP_RUNS", "3"))
+# Backends whose loaded model is safe to inherit across fork().
+FORK_SAFE_BACKENDS = ("pytorch",)
+
+preloaded = False
+
+
+def _limit_torch_threads(threads):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def preload():
+    """Warm everything that can be shared before gunicorn forks the workers."""
+    global preloaded
+    readiness.register("indexes", "model", "class_nutrition")
+    create_indexes()
+    backend = os.getenv("YOLO_BACKEND", "pytorch").lower()
+    if detect.detect_pool is None and backend in FORK_SAFE_BACKENDS:
+        # GNU OpenMP thread pools are not fork-safe: keep the master single-threaded
+        # and size each worker's pool in worker_init().
+        _limit_torch_threads(1)
+        detect.warm_up(runs=WARMUP_RUNS)
+        preloaded = detect.model is not None and detect.class_nutrition is not None
+    # MongoClient is not fork-safe: close the master's sockets and monitor threads;
+    # worker_init() gives each worker its own client.
+    mongo.cx.close()
+    # Move everything allocated so far out of the collector's reach so that
+    # gc passes in the workers don't write to (and un-share) those pages.
+    gc.collect()
+    gc.freeze()
+
+
+def worker_init(threads):
+    """Per-worker setup after fork: Mongo client, thread budget, and warmup if the master didn't."""
+    mongo.init_app(app, tlsCAFile=certifi.where())
+    _limit_torch_threads(threads)
+    if not preloaded:
+        from app import start_warmup
+        start_warmup()
+
+
+if PRELOAD:
+    preload()
@@ -32,6 +32,7 @@ import { Card } from "../ui/card";
 import { BASE_URL } from "@/constants/constants";
 
 export interface MealItem {
+  id?: string;
   name: string;
   time: string;
   calories: number;
@@ -201,6 +202,7 @@ export const MealDetailModal: React.FC<MealDetailModalProps> = ({
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
           mealId: mealsID,
+          entryId: meal.id,
           mealName: meal.name,
           mealData: {
             calories: cal,
@@ -28,6 +28,7 @@ import moment from "moment-timezone";
 import { BASE_URL } from "@/constants/constants";
 
 interface MealItem {
+  id?: string;
   name: string;
   time: string;
   calories: number;
@@ -118,6 +119,7 @@ export function RecentlyEaten({
           },
           body: JSON.stringify({
             mealId: mealsID,
+            entryId: meal.id,
             mealName: meal.name,
           }),
         }
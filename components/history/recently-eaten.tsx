@@ -21,6 +21,7 @@ import { BASE_URL } from "@/constants/constants";
 
 type Meal = {
   _id?: string;
+  id?: string;
   name: string;
   time: string;
   calories: number;
@@ -74,6 +75,7 @@ export function RecentlyEaten({
           },
           body: JSON.stringify({
             mealId: mealsID,
+            entryId: meal.id,
             mealName: meal.name,
           }),
         }